@@ -20,20 +20,74 @@ from modules.crm import CrmCampaign
 st.set_page_config(page_title="PharmaSuite ERP", page_icon="⚕️", layout="wide")
 
 
+# Basic CSS for the notification bell, in case style.css is not comprehensive
+NOTIFICATION_BELL_CSS = """
+.notification-bell {
+    font-size: 24px;
+    cursor: pointer;
+    position: relative;
+    display: inline-block;
+    float: right;
+    margin-top: 10px;
+}
+.notification-badge {
+    position: absolute;
+    top: -5px;
+    right: -10px;
+    background-color: red;
+    color: white;
+    border-radius: 50%;
+    padding: 2px 6px;
+    font-size: 12px;
+    font-weight: bold;
+}
+"""
+
+
 # --- Load Custom CSS ---
-def load_css(file_name="style.css"):
+@st.cache_data(show_spinner=False)
+def _read_css(file_name):
+    """Reads a stylesheet once per process; returns None if it is missing."""
     try:
         with open(file_name) as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+            return f.read()
     except FileNotFoundError:
+        return None
+
+
+def load_css(file_name="style.css"):
+    # Streamlit drops elements that are not re-emitted on a rerun, so the
+    # <style> tag is written every run; only the file read is cached.
+    css = _read_css(file_name)
+    if css is None:
         st.warning(
             f"CSS file '{file_name}' not found. Please create it for custom styling."
         )
+        css = ""
+    st.markdown(f"<style>{css}{NOTIFICATION_BELL_CSS}</style>", unsafe_allow_html=True)
 
 
 load_css()
 
 
+# --- Notification Generation Gate ---
+class NotificationGenerationError(RuntimeError):
+    """The alert generation transaction was rolled back."""
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _ensure_notifications_generated(_manager):
+    """
+    Scans for new alerts at most once per TTL window across all sessions,
+    instead of on every rerun. The leading underscore keeps the manager out
+    of the cache key. A failed run raises, so it isn't cached and the next
+    rerun tries again.
+    """
+    if not _manager.generate_notifications():
+        raise NotificationGenerationError("notification generation failed")
+    return True
+
+
 # --- Main Application ---
 class PharmacyERP:
     """
@@ -43,23 +97,28 @@ class PharmacyERP:
 
     def __init__(self):
         """Initializes all modules and sets up the application structure."""
-        # Initialize notifications first to generate alerts on every page load
+        # Initialize notifications first; alerts are regenerated at most every 5 minutes
         self.notification_manager = NotificationsManager()
-        self.notification_manager.generate_notifications()
+        try:
+            _ensure_notifications_generated(self.notification_manager)
+        except NotificationGenerationError:
+            pass  # execute_transaction already showed the error; retried next run
 
         # --- Modules Dictionary ---
-        # Add or remove modules here to control what appears in the ERP
+        # Add or remove modules here to control what appears in the ERP.
+        # Classes are stored (not instances) so only the selected module is
+        # constructed on each run.
         self.modules = {
-            "Dashboard": DashboardModule(),
-            "Customers": CustomersModule(),
-            "Suppliers": SuppliersModule(),
-            "Inventory": InventoryModule(),
-            "Reports": ReportsModule(),
-            "Expenses": ExpensesModule(),
-            "Notifications": self.notification_manager,
-            "Sales": SalesModule(),
-            "Purchase": PurchaseModule(),
-            "CRM": CrmCampaign(),
+            "Dashboard": DashboardModule,
+            "Customers": CustomersModule,
+            "Suppliers": SuppliersModule,
+            "Inventory": InventoryModule,
+            "Reports": ReportsModule,
+            "Expenses": ExpensesModule,
+            "Notifications": lambda: self.notification_manager,
+            "Sales": SalesModule,
+            "Purchase": PurchaseModule,
+            "CRM": CrmCampaign,
         }
 
         self.module_names = list(self.modules.keys())
@@ -74,8 +133,12 @@ class PharmacyERP:
             # "cart", "cart-check-fill", "megaphone-fill"
         ]
 
+    @st.fragment
     def _render_notification_popover(self):
-        """Renders the notification bell icon and a quick-view popover in the header."""
+        """
+        Renders the notification bell icon and a quick-view popover in the header.
+        Runs as a fragment so popover clicks don't rerun the whole ERP.
+        """
         # This now correctly calls the fixed method in NotificationsManager
         unread_notifications = self.notification_manager.get_unread_notifications()
         count = len(unread_notifications) if unread_notifications is not None else 0
@@ -91,11 +154,12 @@ class PharmacyERP:
                         "Mark as Read", key=f"popover_read_{notif['NotificationID']}"
                     ):
                         self.notification_manager.mark_as_read(notif["NotificationID"])
-                        st.rerun()
+                        # Only the popover fragment reruns, not the whole ERP
+                        st.rerun(scope="fragment")
                 st.markdown("---")
                 if st.button("View All Notifications"):
-                    st.session_state.navigate_to = "Notifications"
-                    st.rerun()
+                    st.query_params["module"] = "Notifications"
+                    st.rerun(scope="app")
             else:
                 st.success("No unread notifications.")
 
@@ -124,15 +188,14 @@ class PharmacyERP:
             self._render_notification_popover()
 
         # --- Cross-Module Navigation Logic ---
-        # This checks if a notification button has requested a page change
-        default_index = 0
-        if (
-            "navigate_to" in st.session_state
-            and st.session_state.navigate_to in self.module_names
-        ):
-            default_index = self.module_names.index(st.session_state.navigate_to)
-            # The 'navigate_to' key is deleted by the target module after it's used,
-            # but we can also add a failsafe here if needed.
+        # The selected module lives in the URL (?module=...), so notification
+        # buttons can request a page change and links to a module are shareable.
+        requested_module = st.query_params.get("module", self.module_names[0])
+        default_index = (
+            self.module_names.index(requested_module)
+            if requested_module in self.module_names
+            else 0
+        )
 
         # Render the sidebar navigation menu
         with st.sidebar:
@@ -155,40 +218,16 @@ class PharmacyERP:
                 },
             )
 
+        # Keep the URL in sync with the menu selection
+        if selected_module and st.query_params.get("module") != selected_module:
+            st.query_params["module"] = selected_module
+
         # Render the content of the selected module
         if selected_module in self.modules:
-            self.modules[selected_module].render()
+            self.modules[selected_module]().render()
 
 
 # --- Entry Point ---
 if __name__ == "__main__":
-    # Inject some basic CSS for the notification bell if style.css is not comprehensive
-    st.markdown(
-        """
-        <style>
-        .notification-bell {
-            font-size: 24px;
-            cursor: pointer;
-            position: relative;
-            display: inline-block;
-            float: right;
-            margin-top: 10px;
-        }
-        .notification-badge {
-            position: absolute;
-            top: -5px;
-            right: -10px;
-            background-color: red;
-            color: white;
-            border-radius: 50%;
-            padding: 2px 6px;
-            font-size: 12px;
-            font-weight: bold;
-        }
-        </style>
-    """,
-        unsafe_allow_html=True,
-    )
-
     app = PharmacyERP()
     app.run()
@@ -1,8 +1,22 @@
 import streamlit as st
 import mysql.connector
+from mysql.connector import pooling
 import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
 from contextlib import contextmanager
+from itertools import groupby
+from urllib.parse import quote
 import json
+import logging
+
+# connectorx optional hai: mojood ho to bade SELECTs seedha Arrow mein aate hain
+try:
+    import connectorx as cx
+except ImportError:
+    cx = None
+
+logger = logging.getLogger(__name__)
 
 # Database ke credentials ke liye Streamlit ke secrets istemal karein
 DB_CONFIG = {
@@ -10,34 +24,148 @@ DB_CONFIG = {
     "user": st.secrets.get("db_user", "root"),
     "password": st.secrets.get("db_password", "root"),
     "database": st.secrets.get("db_name", "pharmacy_erp"),
+    "port": int(st.secrets.get("db_port", 3306)),
+    "connection_timeout": 5,
 }
 
+# --- Zaroori Indexes (deployment ke waqt database par chalayein) ---
+# Dashboard ke KPI/trend queries inhi columns par filter/group karti hain;
+# in indexes ke baghair har query poori table scan karti hai.
+#
+#   CREATE INDEX idx_inv_date ON sales_invoices (InvoiceDate, GrandTotal);
+#   CREATE INDEX idx_inv_status ON sales_invoices (Status);
+#   CREATE INDEX idx_med_reorder ON medicines ((StockQty < ReorderLevel));  -- MySQL 8.0.13+
+#   CREATE INDEX idx_med_stock ON medicines (StockQty);  -- purane MySQL ke liye
+#   CREATE INDEX idx_cust_created ON customers (created_at);
+#
+# Expense search MATCH ... AGAINST use karti hai, jo FULLTEXT index ke baghair
+# error deti hai:
+#
+#   ALTER TABLE expenses ADD FULLTEXT idx_exp_desc_paidto (Description, PaidTo);
+#
+# Notification generation ka NOT EXISTS check aur unread list dono is index
+# se seek karte hain (Status pehle, taake "Status='Unread'" wali queries bhi
+# isi ko use karein):
+#
+#   CREATE INDEX ix_notif_dedup ON notifications (Status, Type, RelatedTable, RelatedID);
+#
+# Notification search bhi MATCH ... AGAINST use karti hai:
+#
+#   ALTER TABLE notifications ADD FULLTEXT idx_notif_message (Message);
+
+# connectorx ke liye URI; credentials percent-encode hote hain (quote_plus ka
+# "+" userinfo mein space nahi samjha jata)
+CONN_URI = (
+    f"mysql://{quote(DB_CONFIG['user'], safe='')}:"
+    f"{quote(DB_CONFIG['password'], safe='')}"
+    f"@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{quote(DB_CONFIG['database'], safe='')}"
+)
+
+
+@st.cache_resource
+def get_pool():
+    """
+    Poore process ke liye ek shared connection pool banata hai, taake har
+    query par naya TCP/auth handshake na ho.
+    """
+    return pooling.MySQLConnectionPool(
+        pool_name="erp",
+        pool_size=int(st.secrets.get("db_pool_size", 10)),
+        pool_reset_session=False,
+        **DB_CONFIG,
+    )
+
+
+def _get_live_connection():
+    """
+    Pool se connection leta hai. MySQLConnectionPool.get_connection() khud
+    is_connected() check karke band (wait_timeout wale) connection ko
+    reconnect kar deta hai, is liye yahan dobara ping nahi kiya jata.
+    """
+    return get_pool().get_connection()
+
+
+@st.cache_resource
+def get_engine():
+    """
+    pandas ke liye SQLAlchemy engine. Connections upar wale pool se hi aate
+    hain (NullPool), taake do alag pools na banein.
+    """
+    return create_engine(
+        "mysql+mysqlconnector://",
+        creator=_get_live_connection,
+        poolclass=NullPool,
+    )
+
 
 @contextmanager
 def get_db_connection():
-    """Database connections ke liye context manager."""
+    """Database connections ke liye context manager (pool se connection leta hai)."""
     conn = None  # conn ko pehle se None set karein
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = _get_live_connection()
         yield conn
     except mysql.connector.Error as err:
         st.error(f"Database Connection Error: {err}")
         yield None
     finally:
-        if conn and conn.is_connected():
+        # Pooled connection par close() usse wapas pool mein bhej deta hai
+        if conn:
             conn.close()
 
 
-def fetch_data(query, params=None):
-    """Data fetch karke usse Pandas DataFrame mein return karta hai."""
-    with get_db_connection() as conn:
-        if conn:
-            try:
-                return pd.read_sql(query, conn, params=params)
-            except Exception as e:
-                st.error(f"Query Error: {e}")
-                return pd.DataFrame()
-    return pd.DataFrame()
+def _format_params(params):
+    """
+    dict/list params ko JSON string mein badalta hai. Aam case (koi JSON param
+    nahi) mein params ko waise hi return karta hai, naya tuple nahi banata.
+    """
+    if not params:
+        return ()
+    if any(isinstance(p, (dict, list)) for p in params):
+        return tuple(
+            json.dumps(p) if isinstance(p, (dict, list)) else p for p in params
+        )
+    return params
+
+
+def fetch_data(query, params=None, parse_dates=None):
+    """
+    Data fetch karke usse Pandas DataFrame mein return karta hai.
+    parse_dates mein diye gaye columns seedha datetime ban kar aate hain.
+    """
+    # SQLAlchemy engine list params qabool nahi karta, pehle ki tarah tuple bana dein
+    params = tuple(params) if isinstance(params, list) else params
+    try:
+        return pd.read_sql_query(
+            query, get_engine(), params=params, parse_dates=parse_dates
+        )
+    except Exception as e:
+        st.error(f"Query Error: {e}")
+        return pd.DataFrame()
+
+
+def fetch_data_arrow(query, parse_dates=None):
+    """
+    Bade, bina params wale SELECTs ke liye: connectorx se result seedha Arrow
+    mein aata hai (Python tuples nahi banti). DataFrame mein wahi numpy dtypes
+    hote hain jo fetch_data deta hai, taake callers ka behaviour connectorx ke
+    hone ya na hone par na badle. connectorx na ho ya fail ho to error log
+    karke fetch_data par fallback.
+    """
+    if cx is not None:
+        try:
+            table = cx.read_sql(CONN_URI, query, return_type="arrow")
+            df = table.to_pandas()
+            # DATE columns Arrow se datetime.date objects ban kar aate hain;
+            # fallback ki tarah inhein bhi datetime64 bana dein
+            for col in parse_dates or ():
+                df[col] = pd.to_datetime(df[col])
+            return df
+        except Exception:
+            logger.warning(
+                "connectorx read failed, falling back to fetch_data", exc_info=True
+            )
+    return fetch_data(query, parse_dates=parse_dates)
 
 
 def execute_query(query, params=None, return_last_id=False):
@@ -50,14 +178,7 @@ def execute_query(query, params=None, return_last_id=False):
             cursor = conn.cursor()
             try:
                 # JSON data ko sahi se handle karein
-                formatted_params = None
-                if params:
-                    formatted_params = tuple(
-                        json.dumps(p) if isinstance(p, (dict, list)) else p
-                        for p in params
-                    )
-
-                cursor.execute(query, formatted_params or ())
+                cursor.execute(query, _format_params(params))
                 conn.commit()
 
                 # UPDATE: Agar last ID chahiye to woh return karein
@@ -85,14 +206,14 @@ def execute_transaction(queries_with_params):
             cursor = conn.cursor()
             try:
                 conn.start_transaction()
-                for query, params in queries_with_params:
-                    formatted_params = None
-                    if params:
-                        formatted_params = tuple(
-                            json.dumps(p) if isinstance(p, (dict, list)) else p
-                            for p in params
-                        )
-                    cursor.execute(query, formatted_params or ())
+                # Lagataar aane wali same queries ko ek executemany mein bhejein;
+                # sirf consecutive runs group hote hain taake order na badle.
+                for query, group in groupby(queries_with_params, key=lambda qp: qp[0]):
+                    params_list = [_format_params(params) for _, params in group]
+                    if len(params_list) > 1:
+                        cursor.executemany(query, params_list)
+                    else:
+                        cursor.execute(query, params_list[0])
 
                 # FIX: Commit loop ke bahar hona chahiye, taake poori transaction ek saath ho
                 conn.commit()
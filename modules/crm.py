@@ -1,16 +1,155 @@
 import streamlit as st
 import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from db_connector import fetch_data, execute_query
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from db_connector import (
+    fetch_data,
+    fetch_data_arrow,
+    execute_query,
+    execute_transaction,
+)
 import plotly.express as px
 
 
+# --- Cached Data Loaders ---
+# Streamlit reruns the whole script on every widget click, so reads are
+# cached with a TTL and only the columns the UI uses are selected.
+# Call clear_crm_cache() after every write.
+INTERACTIONS_LIMIT = 500
+# Loaders run at most this many at a time, well inside the connection pool
+LOADER_WORKERS = 3
+
+
+class CrmQueryError(RuntimeError):
+    """A cached CRM loader's query failed."""
+
+
+def _checked_read(df):
+    """
+    fetch_data returns a column-less frame when a query fails. Raising instead
+    keeps st.cache_data from holding that empty result for the whole TTL.
+    """
+    if df.columns.empty:
+        raise CrmQueryError("CRM query failed")
+    return df
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_campaigns():
+    return _checked_read(
+        fetch_data(
+            "SELECT CampaignID, Name, Description, StartDate, EndDate, Status "
+            "FROM campaigns ORDER BY StartDate DESC",
+            parse_dates=["StartDate", "EndDate"],
+        )
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_leads():
+    return _checked_read(
+        fetch_data_arrow(
+            "SELECT l.LeadID, l.CampaignID, c.Name as CampaignName, l.Name, l.Email, l.Phone, "
+            "l.Source, l.Status, l.CreatedAt "
+            "FROM leads l LEFT JOIN campaigns c ON l.CampaignID = c.CampaignID "
+            "ORDER BY l.CreatedAt DESC",
+            parse_dates=["CreatedAt"],
+        )
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_interactions(limit=INTERACTIONS_LIMIT):
+    return _checked_read(
+        fetch_data_arrow(
+            "SELECT i.InteractionID, i.LeadID, l.Name as LeadName, i.Type, i.Notes, i.Date, i.Outcome "
+            "FROM interactions i LEFT JOIN leads l ON i.LeadID = l.LeadID "
+            f"ORDER BY i.Date DESC LIMIT {int(limit)}",
+            parse_dates=["Date"],
+        )
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_lead_kpis():
+    """Returns total and converted lead counts computed in SQL."""
+    return _checked_read(
+        fetch_data(
+            "SELECT COUNT(*) AS total, COALESCE(SUM(Status = 'Converted'), 0) AS converted FROM leads"
+        )
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_leads_by_campaign():
+    return _checked_read(
+        fetch_data(
+            "SELECT c.Name AS CampaignName, COUNT(l.LeadID) AS LeadCount "
+            "FROM campaigns c LEFT JOIN leads l ON l.CampaignID = c.CampaignID "
+            "GROUP BY c.CampaignID, c.Name"
+        )
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_leads_by_status():
+    return _checked_read(
+        fetch_data(
+            "SELECT Status, COUNT(*) AS count FROM leads GROUP BY Status ORDER BY count DESC"
+        )
+    )
+
+
+# --- Cached Chart Builders ---
+# Streamlit hashes the DataFrame argument, so unchanged data returns the
+# previously built figure instead of rebuilding its layout on every rerun.
+@st.cache_data(show_spinner=False, max_entries=20)
+def build_leads_bar(leads_by_campaign):
+    return px.bar(
+        leads_by_campaign,
+        x="CampaignName",
+        y="LeadCount",
+        title="Leads per Campaign",
+        labels={"LeadCount": "Number of Leads"},
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=20)
+def build_status_pie(leads_by_status):
+    return px.pie(
+        leads_by_status,
+        names="Status",
+        values="count",
+        title="Lead Status Distribution",
+        hole=0.4,
+    )
+
+
+def clear_crm_cache():
+    """Invalidates all cached CRM reads after a write."""
+    load_campaigns.clear()
+    load_leads.clear()
+    load_interactions.clear()
+    load_lead_kpis.clear()
+    load_leads_by_campaign.clear()
+    load_leads_by_status.clear()
+
+
 class CrmCampaign:
     """
     A comprehensive CRM and Campaign Management module for the PharmaSuite ERP.
     It handles campaigns, leads, interactions, and provides advanced analytics.
     """
 
+    _STATUS_COLOR = {
+        "Active": "green",
+        "Completed": "blue",
+        "Planned": "orange",
+        "Paused": "gray",
+    }
+
     def __init__(self):
         """Initializes session state for filters, forms, and navigation."""
         st.session_state.setdefault("crm_user_role", "Admin")
@@ -20,39 +159,74 @@ class CrmCampaign:
 
     def _get_data(self):
         """Fetches all CRM-related data and calculates analytics."""
-        self.campaigns = fetch_data("SELECT * FROM campaigns ORDER BY StartDate DESC")
-        self.leads = fetch_data(
-            "SELECT l.*, c.Name as CampaignName FROM leads l LEFT JOIN campaigns c ON l.CampaignID = c.CampaignID ORDER BY l.CreatedAt DESC"
-        )
-        self.interactions = fetch_data(
-            "SELECT i.*, l.Name as LeadName FROM interactions i LEFT JOIN leads l ON i.LeadID = l.LeadID ORDER BY i.Date DESC"
+        # The loaders each take their own pooled connection, so run them
+        # concurrently (LOADER_WORKERS at a time) instead of one after another.
+        loaders = (
+            load_campaigns,
+            load_leads,
+            load_interactions,
+            load_lead_kpis,
+            load_leads_by_campaign,
+            load_leads_by_status,
         )
+        ctx = get_script_run_ctx()
+        with ThreadPoolExecutor(
+            max_workers=LOADER_WORKERS,
+            initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+        ) as executor:
+            futures = [executor.submit(loader) for loader in loaders]
+            (
+                self.campaigns,
+                self.leads,
+                self.interactions,
+                kpis,
+                self.leads_by_campaign,
+                self.leads_by_status,
+            ) = [self._loader_result(future) for future in futures]
 
-        # --- Analytics Calculation ---
-        if not self.leads.empty:
-            self.kpi_total_leads = len(self.leads)
-            self.kpi_converted_leads = len(
-                self.leads[self.leads["Status"] == "Converted"]
+        # Pre-format campaign dates once, vectorized, for display
+        if not self.campaigns.empty:
+            self.campaigns["_StartStr"] = self.campaigns["StartDate"].dt.strftime(
+                "%Y-%m-%d"
             )
-            self.conversion_rate = (
-                (self.kpi_converted_leads / self.kpi_total_leads * 100)
-                if self.kpi_total_leads > 0
-                else 0
+            self.campaigns["_EndStr"] = (
+                self.campaigns["EndDate"].dt.strftime("%Y-%m-%d").fillna("Ongoing")
             )
 
-            self.leads_by_campaign = (
-                self.leads.groupby("CampaignName")["LeadID"]
-                .count()
-                .reset_index()
-                .rename(columns={"LeadID": "LeadCount"})
+        # Build indexed views once so single-row lookups are O(1) .loc calls
+        self._campaigns_by_id = (
+            self.campaigns.set_index("CampaignID", drop=False)
+            if not self.campaigns.empty
+            else self.campaigns
+        )
+        if not self.leads.empty:
+            self._leads_by_id = self.leads.set_index("LeadID", drop=False)
+            self._leads_by_name = self.leads.drop_duplicates("Name").set_index(
+                "Name", drop=False
             )
-            self.leads_by_status = self.leads["Status"].value_counts().reset_index()
+        else:
+            self._leads_by_id = self._leads_by_name = self.leads
+
+        # --- Analytics Calculation ---
+        if not kpis.empty:
+            self.kpi_total_leads = int(kpis["total"].iloc[0])
+            self.kpi_converted_leads = int(kpis["converted"].iloc[0])
         else:
             self.kpi_total_leads = 0
             self.kpi_converted_leads = 0
-            self.conversion_rate = 0
-            self.leads_by_campaign = pd.DataFrame()
-            self.leads_by_status = pd.DataFrame()
+        self.conversion_rate = (
+            (self.kpi_converted_leads / self.kpi_total_leads * 100)
+            if self.kpi_total_leads > 0
+            else 0
+        )
+
+    @staticmethod
+    def _loader_result(future):
+        """A loader's frame, or an empty one (not cached) if its query failed."""
+        try:
+            return future.result()
+        except CrmQueryError:
+            return pd.DataFrame()
 
     def render(self):
         """Main render method to display the CRM module UI."""
@@ -84,6 +258,8 @@ class CrmCampaign:
             ["📊 Dashboard & Campaigns", "👥 Leads Management", "📞 Interaction Logs"]
         )
 
+        # Each tab is a fragment, so widgets inside a tab only rerun that tab.
+        # Routing changes and writes call st.rerun(scope="app").
         with tabs[0]:
             self._render_dashboard_tab()
         with tabs[1]:
@@ -91,6 +267,7 @@ class CrmCampaign:
         with tabs[2]:
             self._render_interactions_tab()
 
+    @st.fragment
     def _render_dashboard_tab(self):
         """Renders the main dashboard with KPIs, charts, and the campaign list."""
         st.subheader("Campaign Performance Overview")
@@ -106,23 +283,13 @@ class CrmCampaign:
         # Analytics Charts
         chart_cols = st.columns(2)
         if not self.leads_by_campaign.empty:
-            fig_leads = px.bar(
-                self.leads_by_campaign,
-                x="CampaignName",
-                y="LeadCount",
-                title="Leads per Campaign",
-                labels={"LeadCount": "Number of Leads"},
+            chart_cols[0].plotly_chart(
+                build_leads_bar(self.leads_by_campaign), use_container_width=True
             )
-            chart_cols[0].plotly_chart(fig_leads, use_container_width=True)
         if not self.leads_by_status.empty:
-            fig_status = px.pie(
-                self.leads_by_status,
-                names="Status",
-                values="count",
-                title="Lead Status Distribution",
-                hole=0.4,
+            chart_cols[1].plotly_chart(
+                build_status_pie(self.leads_by_status), use_container_width=True
             )
-            chart_cols[1].plotly_chart(fig_status, use_container_width=True)
 
         st.markdown("---")
 
@@ -130,68 +297,93 @@ class CrmCampaign:
         st.subheader("Manage Campaigns")
         if st.button("➕ Create New Campaign"):
             st.session_state.editing_campaign_id = "new"
-            st.rerun()
+            st.rerun(scope="app")
 
         if not self.campaigns.empty:
-            for _, campaign in self.campaigns.iterrows():
-                self._render_campaign_row(campaign)
-
-    def _render_campaign_row(self, campaign):
-        """Renders a single campaign with details and action buttons."""
-        st.markdown("---")
-        status_color = {
-            "Active": "green",
-            "Completed": "blue",
-            "Planned": "orange",
-            "Paused": "gray",
-        }.get(campaign["Status"], "gray")
-
-        cols = st.columns([3, 2, 2])
-        cols[0].markdown(f"**{campaign['Name']}**")
-        cols[0].caption(campaign["Description"])
-        cols[1].markdown(
-            f"**Status:** <span style='color:{status_color};'>{campaign['Status']}</span>",
-            unsafe_allow_html=True,
-        )
-        cols[1].markdown(
-            f"**Duration:** {campaign['StartDate']} to {campaign['EndDate'] or 'Ongoing'}"
-        )
-
-        with cols[2]:
-            st.write("")  # Spacer
-            if st.button(
-                "➕ Add Lead",
-                key=f"add_lead_{campaign['CampaignID']}",
+            # One grid; selecting a row shows the action bar below it
+            event = st.dataframe(
+                self.campaigns,
                 use_container_width=True,
-            ):
-                st.session_state.adding_lead_to_campaign_id = campaign["CampaignID"]
-                st.rerun()
-
-            action_cols = st.columns(2)
-            if action_cols[0].button(
-                "✏️", key=f"edit_camp_{campaign['CampaignID']}", help="Edit Campaign"
-            ):
-                st.session_state.editing_campaign_id = campaign["CampaignID"]
-                st.rerun()
-            if action_cols[1].button(
-                "🗑️", key=f"del_camp_{campaign['CampaignID']}", help="Delete Campaign"
-            ):
-                execute_query(
-                    "DELETE FROM campaigns WHERE CampaignID = %s",
-                    (campaign["CampaignID"],),
+                hide_index=True,
+                key="crm_campaigns_table",
+                on_select="rerun",
+                selection_mode="single-row",
+                column_config={
+                    "CampaignID": None,
+                    "Name": "Campaign",
+                    "Description": "Description",
+                    "StartDate": None,
+                    "EndDate": None,
+                    "Status": "Status",
+                    "_StartStr": "Start Date",
+                    "_EndStr": "End Date",
+                },
+            )
+            if event.selection.rows:
+                self._render_campaign_actions(
+                    self.campaigns.iloc[event.selection.rows[0]]
                 )
-                st.success(f"Campaign '{campaign['Name']}' deleted.")
-                st.rerun()
+            self._render_bulk_campaign_form()
+
+    def _render_bulk_campaign_form(self):
+        """
+        Renders bulk actions in a form so several campaigns are updated with
+        a single submit (and a single rerun).
+        """
+        campaign_names = self._campaigns_by_id["Name"]
+        with st.form("campaigns_bulk"):
+            selected_ids = st.multiselect(
+                "Bulk Actions: Select Campaigns",
+                options=campaign_names.index.tolist(),
+                format_func=lambda cid: campaign_names[cid],
+            )
+            c1, c2 = st.columns(2)
+            pause_clicked = c1.form_submit_button("⏸️ Mark as Paused")
+            delete_clicked = c2.form_submit_button("🗑️ Delete Selected")
+
+        if (pause_clicked or delete_clicked) and not selected_ids:
+            st.warning("Please select at least one campaign.")
+        elif pause_clicked or delete_clicked:
+            if delete_clicked:
+                query = "DELETE FROM campaigns WHERE CampaignID = %s"
+            else:
+                query = "UPDATE campaigns SET Status = 'Paused', UpdatedAt = NOW() WHERE CampaignID = %s"
+            if execute_transaction([(query, (int(cid),)) for cid in selected_ids]):
+                st.success(f"{len(selected_ids)} campaign(s) updated.")
+                clear_crm_cache()
+                st.rerun(scope="app")
+
+    def _render_campaign_actions(self, campaign):
+        """Renders the action bar for the campaign selected in the grid."""
+        campaign_id = int(campaign["CampaignID"])
+        status_color = self._STATUS_COLOR.get(campaign["Status"], "gray")
+        st.markdown(
+            f"**Selected:** {campaign['Name']} &nbsp; "
+            f"<span style='color:{status_color};'>{campaign['Status']}</span> &nbsp; "
+            f"({campaign['_StartStr']} to {campaign['_EndStr']})",
+            unsafe_allow_html=True,
+        )
+        action_cols = st.columns(3)
+        if action_cols[0].button("➕ Add Lead", use_container_width=True):
+            st.session_state.adding_lead_to_campaign_id = campaign_id
+            st.rerun(scope="app")
+        if action_cols[1].button("✏️ Edit Campaign", use_container_width=True):
+            st.session_state.editing_campaign_id = campaign_id
+            st.rerun(scope="app")
+        if action_cols[2].button("🗑️ Delete Campaign", use_container_width=True):
+            execute_query(
+                "DELETE FROM campaigns WHERE CampaignID = %s",
+                (campaign_id,),
+            )
+            st.success(f"Campaign '{campaign['Name']}' deleted.")
+            clear_crm_cache()
+            st.rerun(scope="app")
 
     def _render_campaign_form(self, campaign_id):
         """Renders the form for creating or editing a campaign."""
         is_edit = campaign_id != "new"
         title = "Edit Campaign" if is_edit else "Create New Campaign"
-        campaign_data = (
-            self.campaigns[self.campaigns["CampaignID"] == campaign_id].iloc[0]
-            if is_edit
-            else None
-        )
+        campaign_data = self._campaigns_by_id.loc[campaign_id] if is_edit else None
 
         with st.form("campaign_form"):
             st.subheader(title)
@@ -205,17 +397,13 @@ class CrmCampaign:
             c1, c2 = st.columns(2)
             start_date = c1.date_input(
                 "Start Date",
-                value=(
-                    pd.to_datetime(campaign_data["StartDate"]).date()
-                    if is_edit
-                    else date.today()
-                ),
+                value=(campaign_data["StartDate"].date() if is_edit else date.today()),
             )
             end_date = c2.date_input(
                 "End Date (optional)",
                 value=(
-                    pd.to_datetime(campaign_data["EndDate"]).date()
-                    if is_edit and campaign_data["EndDate"]
+                    campaign_data["EndDate"].date()
+                    if is_edit and pd.notna(campaign_data["EndDate"])
                     else None
                 ),
             )
@@ -249,12 +437,14 @@ class CrmCampaign:
                     if execute_query(query, params):
                         st.success(f"Campaign '{name}' saved successfully.")
                         st.session_state.editing_campaign_id = None
+                        clear_crm_cache()
                         st.rerun()
 
             if cancelled:
                 st.session_state.editing_campaign_id = None
                 st.rerun()
 
+    @st.fragment
     def _render_leads_tab(self):
         """Renders the UI for managing leads."""
         st.subheader("Manage Leads")
@@ -282,17 +472,13 @@ class CrmCampaign:
         )
         if st.button("Log Interaction for Selected Lead"):
             if selected_lead:
-                lead_id = self.leads[self.leads["Name"] == selected_lead][
-                    "LeadID"
-                ].iloc[0]
+                lead_id = self._leads_by_name.at[selected_lead, "LeadID"]
                 st.session_state.logging_interaction_for_lead_id = lead_id
-                st.rerun()
+                st.rerun(scope="app")
 
     def _render_lead_form(self, campaign_id):
         """Renders the form to add a new lead to a specific campaign."""
-        campaign_name = self.campaigns[self.campaigns["CampaignID"] == campaign_id][
-            "Name"
-        ].iloc[0]
+        campaign_name = self._campaigns_by_id.at[campaign_id, "Name"]
         with st.form("add_lead_form"):
             st.subheader(f"Add New Lead to Campaign: {campaign_name}")
             name = st.text_input("Lead Name*")
@@ -312,11 +498,13 @@ class CrmCampaign:
                     if execute_query(query, (campaign_id, name, email, phone, source)):
                         st.success(f"Lead '{name}' added successfully.")
                         st.session_state.adding_lead_to_campaign_id = None
+                        clear_crm_cache()
                         st.rerun()
             if cancelled:
                 st.session_state.adding_lead_to_campaign_id = None
                 st.rerun()
 
+    @st.fragment
     def _render_interactions_tab(self):
         """Renders the historical log of all interactions."""
         st.subheader("Interaction Logs")
@@ -337,7 +525,7 @@ class CrmCampaign:
 
     def _render_interaction_form(self, lead_id):
         """Renders the form to log a new interaction for a lead."""
-        lead_name = self.leads[self.leads["LeadID"] == lead_id]["Name"].iloc[0]
+        lead_name = self._leads_by_id.at[lead_id, "Name"]
         with st.form("log_interaction_form"):
             st.subheader(f"Log Interaction for: {lead_name}")
             interaction_type = st.selectbox(
@@ -360,18 +548,20 @@ class CrmCampaign:
                 else:
                     # Log the interaction
                     query_interaction = "INSERT INTO interactions (LeadID, Type, Notes, Outcome) VALUES (%s, %s, %s, %s)"
-                    execute_query(
-                        query_interaction, (lead_id, interaction_type, notes, outcome)
-                    )
+                    queries = [
+                        (query_interaction, (lead_id, interaction_type, notes, outcome))
+                    ]
 
-                    # Update lead status if changed
+                    # Update lead status if changed (same transaction)
                     if new_lead_status != "(No Change)":
                         query_status = "UPDATE leads SET Status = %s WHERE LeadID = %s"
-                        execute_query(query_status, (new_lead_status, lead_id))
+                        queries.append((query_status, (new_lead_status, lead_id)))
 
-                    st.success(f"Interaction for '{lead_name}' logged.")
-                    st.session_state.logging_interaction_for_lead_id = None
-                    st.rerun()
+                    if execute_transaction(queries):
+                        st.success(f"Interaction for '{lead_name}' logged.")
+                        st.session_state.logging_interaction_for_lead_id = None
+                        clear_crm_cache()
+                        st.rerun()
             if cancelled:
                 st.session_state.logging_interaction_for_lead_id = None
                 st.rerun()
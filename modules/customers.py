@@ -1,9 +1,178 @@
+import io
 import streamlit as st
 import pandas as pd
 from datetime import date
 from db_connector import fetch_data, execute_query
 
 
+SEARCH_COLUMNS = ["name", "phone", "email", "city", "country"]
+ITEMS_PER_PAGE = 10
+DATE_COLUMNS = ["dob", "last_purchase_date", "created_at", "updated_at"]
+GENDERS = ("Male", "Female", "Other")
+STATUSES = ("Active", "Inactive")
+GENDER_INDEX = {g: i for i, g in enumerate(GENDERS)}
+STATUS_INDEX = {s: i for i, s in enumerate(STATUSES)}
+CUSTOMER_FORM_DEFAULTS = {
+    "name": "",
+    "dob": None,
+    "phone": "",
+    "email": "",
+    "gender": "Male",
+    "status": "Active",
+    "address": "",
+    "city": "",
+    "state": "",
+    "postal_code": "",
+    "country": "",
+    "total_purchases": 0.0,
+    "outstanding_amount": 0.0,
+    "last_purchase_date": None,
+    "loyalty_points": 0,
+    "notes": "",
+}
+
+
+def _prepare_customers(customers):
+    """
+    Converts date columns, stores low-cardinality text columns as categories,
+    and adds the calculated 'age' column.
+    """
+    if customers.empty:
+        return customers
+    for col in ("status", "gender"):
+        customers[col] = customers[col].astype("category")
+    # One bulk conversion; columns stay datetime64 so later date maths is vectorized
+    customers[DATE_COLUMNS] = customers[DATE_COLUMNS].apply(
+        pd.to_datetime, errors="coerce", cache=True
+    )
+
+    # Vectorized age: subtract one year if this year's birthday hasn't come yet
+    today = pd.Timestamp(date.today())
+    dob = customers["dob"]
+    before_birthday = (dob.dt.month * 100 + dob.dt.day) > (
+        today.month * 100 + today.day
+    )
+    customers["age"] = (today.year - dob.dt.year - before_birthday.astype(int)).astype(
+        "Int64"
+    )
+    return customers
+
+
+def _build_customer_filter(search_term, status_filter, gender_filter):
+    """Builds the shared WHERE clause and params for the list, count and export queries."""
+    clauses, params = [], []
+    if status_filter != "All":
+        clauses.append("status = %s")
+        params.append(status_filter)
+    if gender_filter != "All":
+        clauses.append("gender = %s")
+        params.append(gender_filter)
+    if search_term:
+        clauses.append(
+            "(" + " OR ".join(f"{col} LIKE %s" for col in SEARCH_COLUMNS) + ")"
+        )
+        params.extend([f"%{search_term.strip()}%"] * len(SEARCH_COLUMNS))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, tuple(params)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _count_customers(where, params):
+    counts = fetch_data(f"SELECT COUNT(*) AS total FROM customers{where}", params)
+    return int(counts.iloc[0]["total"]) if not counts.empty else 0
+
+
+class CustomerQueryError(RuntimeError):
+    """A cached customer loader's query failed."""
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_customers_page(where, params, limit, offset):
+    """
+    Fetches a single page of customers matching the filters. A failed query
+    (fetch_data's column-less frame) raises, so the failure isn't cached.
+    """
+    customers = fetch_data(
+        f"SELECT * FROM customers{where} ORDER BY id LIMIT %s OFFSET %s",
+        params + (limit, offset),
+    )
+    if customers.columns.empty:
+        raise CustomerQueryError("customer page query failed")
+    return _prepare_customers(customers)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _export_customers_csv(where, params):
+    """
+    Builds the CSV for every customer matching the filters. Written in chunks
+    to a binary buffer and cached per filter set, so repeat downloads are free.
+    """
+    customers = _prepare_customers(
+        fetch_data(f"SELECT * FROM customers{where} ORDER BY id", params)
+    )
+    buffer = io.BytesIO()
+    customers.to_csv(buffer, index=False, encoding="utf-8", chunksize=10000)
+    return buffer.getvalue()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_customer(customer_id):
+    """Primary-key lookup for the edit form."""
+    customer = _prepare_customers(
+        fetch_data("SELECT * FROM customers WHERE id = %s", (int(customer_id),))
+    )
+    if customer.empty:
+        return {}
+    customer_data = customer.iloc[0].to_dict()
+    # Form date inputs need plain dates (or None), not Timestamp/NaT
+    for col in DATE_COLUMNS:
+        value = customer_data.get(col)
+        customer_data[col] = value.date() if pd.notna(value) else None
+    return customer_data
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _compute_kpis():
+    """
+    Computes every customer KPI (aggregated in SQL) and returns them as one
+    dict, so reruns that only change pagination or filters do no KPI work.
+    """
+    counts = fetch_data(
+        """
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(status = 'Active'), 0) AS active,
+               COALESCE(SUM(outstanding_amount > 0), 0) AS outstanding,
+               AVG(TIMESTAMPDIFF(YEAR, dob, CURDATE())) AS avg_age
+        FROM customers
+        """
+    )
+    top_5 = fetch_data(
+        "SELECT name, total_purchases FROM customers ORDER BY total_purchases DESC LIMIT 5"
+    )
+
+    kpis = {"total": 0, "active": 0, "outstanding": 0, "avg_age": 0}
+    if not counts.empty:
+        row = counts.iloc[0]
+        kpis["total"] = int(row["total"])
+        kpis["active"] = int(row["active"])
+        kpis["outstanding"] = int(row["outstanding"])
+        kpis["avg_age"] = int(row["avg_age"]) if pd.notna(row["avg_age"]) else 0
+    kpis["inactive"] = kpis["total"] - kpis["active"]
+    kpis["top_5"] = (
+        top_5 if not top_5.empty else pd.DataFrame(columns=["name", "total_purchases"])
+    )
+    return kpis
+
+
+def _clear_customer_cache():
+    """Invalidates all cached customer reads after a write."""
+    _count_customers.clear()
+    _load_customers_page.clear()
+    _export_customers_csv.clear()
+    _load_customer.clear()
+    _compute_kpis.clear()
+
+
 class CustomersModule:
     """
     Manages all customer-related operations with a premium UI, including full CRUD,
@@ -16,90 +185,62 @@ class CustomersModule:
         st.session_state.setdefault("confirm_delete_customer_id", None)
         st.session_state.setdefault("customer_page_number", 1)
 
-    def _calculate_age(self, born):
-        """Calculates age in years from a date of birth."""
+    def _calculate_age(self, born, today=None):
+        """
+        Calculates age in years from a date of birth. Pass `today` when the
+        caller already has it, to avoid another date.today() call.
+        """
         if pd.isnull(born) or not isinstance(born, date):
             return None
-        today = date.today()
+        today = today or date.today()
         return (
             today.year - born.year - ((today.month, today.day) < (born.month, born.day))
         )
 
     def _get_data(self):
         """
-        Fetches customer data, calculates the 'age' column, and computes all KPIs.
+        Loads all KPIs. Customer rows are fetched page by page in
+        _display_filtered_customers.
         """
-        self.customers = fetch_data("SELECT * FROM customers")
-
-        if self.customers is not None and not self.customers.empty:
-            # --- Data Type Conversion and Calculated Columns ---
-            date_cols = ["dob", "last_purchase_date", "created_at", "updated_at"]
-            for col in date_cols:
-                self.customers[col] = pd.to_datetime(
-                    self.customers[col], errors="coerce"
-                ).dt.date
-
-            self.customers["age"] = self.customers["dob"].apply(self._calculate_age)
-
-            # --- KPI Calculations ---
-            self.kpi_total_customers = len(self.customers)
-            self.kpi_active_customers = self.customers[
-                self.customers["status"] == "Active"
-            ].shape[0]
-            self.kpi_inactive_customers = (
-                self.kpi_total_customers - self.kpi_active_customers
-            )
-            self.kpi_avg_age = (
-                int(self.customers["age"].mean())
-                if not self.customers["age"].isnull().all()
-                else 0
-            )
-            self.kpi_outstanding_customers = self.customers[
-                self.customers["outstanding_amount"] > 0
-            ].shape[0]
-            self.top_5_customers = self.customers.nlargest(5, "total_purchases")[
-                ["name", "total_purchases"]
-            ]
-        else:
-            self.kpi_total_customers = self.kpi_active_customers = (
-                self.kpi_inactive_customers
-            ) = 0
-            self.kpi_avg_age = self.kpi_outstanding_customers = 0
-            self.top_5_customers = pd.DataFrame(columns=["name", "total_purchases"])
+        self.kpis = _compute_kpis()
 
     def render(self):
         """Main render method that routes to the correct view (list or form)."""
-        self._get_data()
         st.title("👥 Advanced Customer Management")
 
         if st.session_state.editing_customer_id is not None:
-            self._render_customer_form(st.session_state.editing_customer_id)
+            # The form only needs one row, so skip the KPI/list loading
+            customer_id = st.session_state.editing_customer_id
+            customer_data = _load_customer(customer_id) if customer_id != "new" else {}
+            self._render_customer_form(customer_id, customer_data)
         else:
+            self._get_data()
             self._render_main_view()
 
     def _render_main_view(self):
         """Renders KPIs and the main customer view with filters and pagination."""
         self._render_kpis()
         st.markdown("---")
-        self._display_filtered_customers()
+        # Sidebar widgets can't live inside a fragment, so filters are read here
+        self._display_filtered_customers(*self._render_sidebar_filters())
 
     def _render_kpis(self):
         """Renders the KPI cards at the top of the page."""
         kpi_cols = st.columns(5)
         kpi_cols[0].markdown(
-            f'<div class="kpi-card"><p class="kpi-title">Total Customers</p><p class="kpi-value">{self.kpi_total_customers}</p></div>',
+            f'<div class="kpi-card"><p class="kpi-title">Total Customers</p><p class="kpi-value">{self.kpis["total"]}</p></div>',
             unsafe_allow_html=True,
         )
         kpi_cols[1].markdown(
-            f'<div class="kpi-card"><p class="kpi-title">Active / Inactive</p><p class="kpi-value">{self.kpi_active_customers} / {self.kpi_inactive_customers}</p></div>',
+            f'<div class="kpi-card"><p class="kpi-title">Active / Inactive</p><p class="kpi-value">{self.kpis["active"]} / {self.kpis["inactive"]}</p></div>',
             unsafe_allow_html=True,
         )
         kpi_cols[2].markdown(
-            f'<div class="kpi-card"><p class="kpi-title">Average Age</p><p class="kpi-value">{self.kpi_avg_age}</p></div>',
+            f'<div class="kpi-card"><p class="kpi-title">Average Age</p><p class="kpi-value">{self.kpis["avg_age"]}</p></div>',
             unsafe_allow_html=True,
         )
         kpi_cols[3].markdown(
-            f'<div class="kpi-card"><p class="kpi-title">With Dues</p><p class="kpi-value">{self.kpi_outstanding_customers}</p></div>',
+            f'<div class="kpi-card"><p class="kpi-title">With Dues</p><p class="kpi-value">{self.kpis["outstanding"]}</p></div>',
             unsafe_allow_html=True,
         )
         with kpi_cols[4]:
@@ -107,204 +248,213 @@ class CustomersModule:
                 '<div class="kpi-card" style="text-align:left; padding-left:25px;"><p class="kpi-title">Top 5 by Purchases</p></div>',
                 unsafe_allow_html=True,
             )
-            for i, row in self.top_5_customers.iterrows():
+            for row in self.kpis["top_5"].itertuples(index=False):
                 st.markdown(
-                    f"**{row['name']}**: Rs {row['total_purchases']:,.0f}",
-                    help=f"Exact: {row['total_purchases']}",
+                    f"**{row.name}**: Rs {row.total_purchases:,.0f}",
+                    help=f"Exact: {row.total_purchases}",
                 )
 
-    def _display_filtered_customers(self):
-        """Displays advanced search filters and the resulting paginated customer list."""
+    def _render_sidebar_filters(self):
+        """Renders the sidebar search/filter widgets and returns their values."""
         st.sidebar.header("🔍 Search & Filter Customers")
         search_term = st.sidebar.text_input("Search by Name, Phone, Email, City...")
-        status_filter = st.sidebar.selectbox(
-            "Filter by Status", ["All", "Active", "Inactive"]
-        )
-        gender_filter = st.sidebar.selectbox(
-            "Filter by Gender", ["All", "Male", "Female", "Other"]
-        )
+        status_filter = st.sidebar.selectbox("Filter by Status", ("All",) + STATUSES)
+        gender_filter = st.sidebar.selectbox("Filter by Gender", ("All",) + GENDERS)
+        return search_term, status_filter, gender_filter
 
-        # --- Filtering Logic ---
-        filtered_df = self.customers.copy()
-        if search_term:
-            filtered_df = filtered_df[
-                filtered_df.apply(
-                    lambda row: any(
-                        search_term.lower() in str(val).lower()
-                        for val in row[["name", "phone", "email", "city", "country"]]
-                    ),
-                    axis=1,
-                )
-            ]
-        if status_filter != "All":
-            filtered_df = filtered_df[filtered_df["status"] == status_filter]
-        if gender_filter != "All":
-            filtered_df = filtered_df[filtered_df["gender"] == gender_filter]
+    @st.fragment
+    def _display_filtered_customers(self, search_term, status_filter, gender_filter):
+        """
+        Displays the paginated customer list for the given filters. Runs as a
+        fragment, so paging and row actions don't reload the KPIs.
+        """
+        # --- Filtering Logic (pushed to SQL) ---
+        where, params = _build_customer_filter(
+            search_term, status_filter, gender_filter
+        )
+        total_matching = _count_customers(where, params)
 
         # --- Display and Pagination ---
         list_col, btn_col = st.columns([3, 1])
         list_col.subheader("All Customers")
         if btn_col.button("➕ Add New Customer", use_container_width=True):
             st.session_state.editing_customer_id = "new"
-            st.rerun()
-
-        if not filtered_df.empty:
-            st.download_button(
-                "📥 Export as CSV",
-                filtered_df.to_csv(index=False).encode("utf-8"),
-                "customers.csv",
-                "text/csv",
-            )
+            st.rerun(scope="app")
+
+        if total_matching > 0:
+            # Export pulls every matching row, so it only runs on request
+            if st.button("Prepare CSV Export"):
+                st.download_button(
+                    "📥 Export as CSV",
+                    _export_customers_csv(where, params),
+                    "customers.csv",
+                    "text/csv",
+                )
 
-            items_per_page = 10
-            total_pages = (len(filtered_df) + items_per_page - 1) // items_per_page
+            total_pages = (total_matching + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
             page_number = st.number_input(
                 "Page",
                 min_value=1,
                 max_value=total_pages,
-                value=st.session_state.customer_page_number,
+                value=min(st.session_state.customer_page_number, total_pages),
                 key="cust_page_selector",
             )
             st.session_state.customer_page_number = page_number
 
-            start_idx = (page_number - 1) * items_per_page
-            end_idx = start_idx + items_per_page
-            paginated_df = filtered_df.iloc[start_idx:end_idx]
+            try:
+                paginated_df = _load_customers_page(
+                    where,
+                    params,
+                    ITEMS_PER_PAGE,
+                    (page_number - 1) * ITEMS_PER_PAGE,
+                )
+            except CustomerQueryError:
+                paginated_df = pd.DataFrame()
 
-            for _, customer in paginated_df.iterrows():
-                self._render_customer_row(customer)
+            if paginated_df.empty:
+                st.warning("No customers to show on this page.")
+            else:
+                self._render_customer_table(paginated_df)
         else:
             st.warning("No customers match your search criteria.")
 
-    def _render_customer_row(self, customer):
-        """Renders a single customer's information in a detailed row format."""
-        st.markdown("---")
-        row_cols = st.columns((3, 3, 2, 2, 2))
-
-        status_class = "status-ok" if customer["status"] == "Active" else "status-low"
-        row_cols[0].markdown(
-            f"**{customer['name']}** ({customer.get('age', 'N/A')} yrs, {customer.get('gender', 'N/A')})"
-        )
-        row_cols[0].caption(
-            f"📍 {customer.get('city', 'N/A')}, {customer.get('country', 'N/A')}"
-        )
-
-        row_cols[1].markdown(
-            f"📞 {customer.get('phone', 'N/A')}<br>✉️ {customer.get('email', 'N/A')}",
-            unsafe_allow_html=True,
+    def _render_customer_table(self, paginated_df):
+        """Renders the current page as one table plus a single action bar."""
+        display_df = paginated_df.assign(
+            Location=paginated_df["city"].fillna("N/A")
+            + ", "
+            + paginated_df["country"].fillna("N/A")
         )
-
-        row_cols[2].markdown(
-            f"**Status:**<br><span class='status-tag {status_class}'>{customer['status']}</span>",
-            unsafe_allow_html=True,
+        st.dataframe(
+            display_df[
+                [
+                    "name",
+                    "age",
+                    "gender",
+                    "Location",
+                    "phone",
+                    "email",
+                    "status",
+                    "total_purchases",
+                    "outstanding_amount",
+                ]
+            ],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "name": "Name",
+                "age": "Age",
+                "gender": "Gender",
+                "phone": "📞 Phone",
+                "email": "✉️ Email",
+                "status": "Status",
+                "total_purchases": st.column_config.NumberColumn(
+                    "Purchases", format="Rs %.0f"
+                ),
+                "outstanding_amount": st.column_config.NumberColumn(
+                    "Dues", format="Rs %.0f"
+                ),
+            },
         )
 
-        row_cols[3].markdown(
-            f"**Purchases:**<br>Rs {customer.get('total_purchases', 0):,.0f}",
-            unsafe_allow_html=True,
-        )
-        row_cols[3].markdown(
-            f"**Dues:**<br>Rs {customer.get('outstanding_amount', 0):,.0f}",
-            unsafe_allow_html=True,
+        names_by_id = dict(zip(paginated_df["id"], paginated_df["name"]))
+        action_cols = st.columns([3, 1, 1])
+        selected_id = action_cols[0].selectbox(
+            "Select a customer",
+            list(names_by_id),
+            format_func=lambda cid: f"{names_by_id[cid]} (#{cid})",
+            label_visibility="collapsed",
         )
-
-        with row_cols[4]:
-            st.write("")  # For vertical alignment
-            action_cols = st.columns(2)
-            if action_cols[0].button(
-                "✏️", key=f"edit_cust_{customer['id']}", help="Edit Customer"
-            ):
-                st.session_state.editing_customer_id = customer["id"]
-                st.rerun()
-            if action_cols[1].button(
-                "🗑️",
-                key=f"del_cust_{customer['id']}",
-                help="Delete Customer (Set Inactive)",
-            ):
-                st.session_state.confirm_delete_customer_id = customer["id"]
-                st.rerun()
-
-        self._handle_delete_confirmation(customer["id"])
-
-    def _render_customer_form(self, customer_id):
-        """Renders the comprehensive form for adding or editing a customer."""
+        if action_cols[1].button("✏️ Edit", use_container_width=True):
+            st.session_state.editing_customer_id = selected_id
+            st.rerun(scope="app")
+        if action_cols[2].button(
+            "🗑️ Delete", help="Delete Customer (Set Inactive)", use_container_width=True
+        ):
+            st.session_state.confirm_delete_customer_id = selected_id
+            st.rerun(scope="fragment")
+
+        self._handle_delete_confirmation(selected_id)
+
+    def _render_customer_form(self, customer_id, customer_data):
+        """
+        Renders the comprehensive form for adding or editing a customer.
+        `customer_data` is the pre-fetched row as a dict (empty for a new customer).
+        """
         is_edit = customer_id != "new"
         title = "Edit Customer Details" if is_edit else "➕ Add New Customer"
-        customer_data = (
-            self.customers[self.customers["id"] == customer_id].iloc[0].to_dict()
-            if is_edit
-            else {}
-        )
+        today = date.today()
+        # Normalize once: every field present, NULLs replaced by form defaults
+        customer_data = {
+            key: (
+                customer_data[key]
+                if key in customer_data and pd.notna(customer_data[key])
+                else default
+            )
+            for key, default in CUSTOMER_FORM_DEFAULTS.items()
+        }
 
         with st.form("customer_form"):
             st.subheader(title)
 
             c1, c2, c3 = st.columns(3)
-            name = c1.text_input("Full Name*", value=customer_data.get("name", ""))
+            name = c1.text_input("Full Name*", value=customer_data["name"])
             dob = c2.date_input(
                 "Date of Birth",
-                value=customer_data.get("dob"),
+                value=customer_data["dob"],
                 min_value=date(1920, 1, 1),
-                max_value=date.today(),
+                max_value=today,
             )
-            age_display = self._calculate_age(dob)
+            age_display = self._calculate_age(dob, today)
             c3.metric(
                 "Age", f"{age_display} years" if age_display is not None else "N/A"
             )
 
             c1, c2 = st.columns(2)
-            phone = c1.text_input("Phone*", value=customer_data.get("phone", ""))
-            email = c2.text_input("Email", value=customer_data.get("email", ""))
+            phone = c1.text_input("Phone*", value=customer_data["phone"])
+            email = c2.text_input("Email", value=customer_data["email"])
             gender = c1.selectbox(
                 "Gender",
-                ["Male", "Female", "Other"],
-                index=["Male", "Female", "Other"].index(
-                    customer_data.get("gender", "Male")
-                ),
+                GENDERS,
+                index=GENDER_INDEX.get(customer_data["gender"], 0),
             )
             status = c2.selectbox(
                 "Status",
-                ["Active", "Inactive"],
-                index=["Active", "Inactive"].index(
-                    customer_data.get("status", "Active")
-                ),
+                STATUSES,
+                index=STATUS_INDEX.get(customer_data["status"], 0),
             )
 
             st.markdown("<h6>Address Details</h6>", unsafe_allow_html=True)
-            address = st.text_input(
-                "Street Address", value=customer_data.get("address", "")
-            )
+            address = st.text_input("Street Address", value=customer_data["address"])
             c1, c2, c3, c4 = st.columns(4)
-            city = c1.text_input("City", value=customer_data.get("city", ""))
-            state = c2.text_input(
-                "State/Province", value=customer_data.get("state", "")
-            )
+            city = c1.text_input("City", value=customer_data["city"])
+            state = c2.text_input("State/Province", value=customer_data["state"])
             postal_code = c3.text_input(
-                "Postal Code", value=customer_data.get("postal_code", "")
+                "Postal Code", value=customer_data["postal_code"]
             )
-            country = c4.text_input("Country", value=customer_data.get("country", ""))
+            country = c4.text_input("Country", value=customer_data["country"])
 
             st.markdown("<h6>Financial & Loyalty Details</h6>", unsafe_allow_html=True)
             c1, c2, c3, c4 = st.columns(4)
             total_purchases = c1.number_input(
                 "Total Purchases",
-                value=float(customer_data.get("total_purchases", 0.0)),
+                value=float(customer_data["total_purchases"]),
                 format="%.2f",
             )
             outstanding_amount = c2.number_input(
                 "Outstanding Amount",
-                value=float(customer_data.get("outstanding_amount", 0.0)),
+                value=float(customer_data["outstanding_amount"]),
                 format="%.2f",
             )
             last_purchase_date = c3.date_input(
-                "Last Purchase Date", value=customer_data.get("last_purchase_date")
+                "Last Purchase Date", value=customer_data["last_purchase_date"]
             )
             loyalty_points = c4.number_input(
                 "Loyalty Points",
-                value=int(customer_data.get("loyalty_points", 0)),
+                value=int(customer_data["loyalty_points"]),
                 step=1,
             )
-            notes = st.text_area("Notes", value=customer_data.get("notes", ""))
+            notes = st.text_area("Notes", value=customer_data["notes"])
 
             submitted = st.form_submit_button("Save Customer", type="primary")
             cancelled = st.form_submit_button("Cancel")
@@ -341,6 +491,7 @@ class CustomersModule:
                     if execute_query(query, params):
                         st.success(f"Customer '{name}' was saved successfully!")
                         st.session_state.editing_customer_id = None
+                        _clear_customer_cache()
                         st.rerun()
             if cancelled:
                 st.session_state.editing_customer_id = None
@@ -364,9 +515,11 @@ class CustomersModule:
                 ):
                     st.success("Customer status set to Inactive.")
                     st.session_state.confirm_delete_customer_id = None
-                    st.rerun()
+                    _clear_customer_cache()
+                    # KPIs change too, so rerun the whole page
+                    st.rerun(scope="app")
             if confirm_cols[1].button(
                 "No, Cancel", key=f"cancel_del_cust_{customer_id}"
             ):
                 st.session_state.confirm_delete_customer_id = None
-                st.rerun()
+                st.rerun(scope="fragment")
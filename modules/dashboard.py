@@ -4,6 +4,76 @@ import plotly.express as px
 from db_connector import fetch_data  # Assuming db_connector.py is correctly set up
 
 
+# --- Cached Queries ---
+# The dashboard is read-only, so each query is cached with a short TTL instead
+# of hitting MySQL on every rerun.
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_kpis():
+    """All four KPI scalars in a single round trip, one scalar subquery each."""
+    return fetch_data(
+        """
+        SELECT
+            (SELECT SUM(GrandTotal) FROM sales_invoices
+                WHERE InvoiceDate = CURDATE()) AS sales_today,
+            (SELECT COUNT(*) FROM medicines
+                WHERE StockQty < ReorderLevel) AS low_stock_items,
+            (SELECT COUNT(*) FROM sales_invoices
+                WHERE Status = 'Pending') AS pending_invoices,
+            (SELECT COUNT(*) FROM customers
+                WHERE created_at >= CURDATE() - INTERVAL 7 DAY) AS new_customers
+        """
+    )
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_sales_trend():
+    # Sales Trend (FIXED: Corrected 'InvoiceDate' and 'GrandTotal')
+    return fetch_data(
+        """
+        SELECT InvoiceDate, SUM(GrandTotal) as daily_sales 
+        FROM sales_invoices 
+        WHERE InvoiceDate >= CURDATE() - INTERVAL 30 DAY 
+        GROUP BY InvoiceDate 
+        ORDER BY InvoiceDate ASC
+        """
+    )
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_low_stock_medicines():
+    # Low Stock Medicines Table
+    return fetch_data(
+        """
+        SELECT MedicineName, Category, StockQty, ReorderLevel
+        FROM medicines
+        WHERE StockQty < ReorderLevel
+        ORDER BY StockQty ASC
+        LIMIT 10
+        """
+    )
+
+
+# --- Cached Chart Builders ---
+# Streamlit hashes the DataFrame argument, so the figure is only rebuilt when
+# the sales trend data actually changes.
+@st.cache_data(ttl=60, show_spinner=False)
+def _build_sales_figure(sales_trend):
+    fig = px.area(
+        sales_trend,
+        x="InvoiceDate",
+        y="daily_sales",
+        markers=True,
+        labels={"InvoiceDate": "Date", "daily_sales": "Total Sales (PKR)"},
+    )
+    fig.update_traces(line_color="#28a745", fillcolor="rgba(40, 167, 69, 0.2)")
+    fig.update_layout(
+        margin=dict(l=20, r=20, t=20, b=20),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+    )
+    return fig
+
+
 class DashboardModule:
     """
     Renders a modern, animated dashboard with KPIs, charts, and key data tables
@@ -20,64 +90,19 @@ class DashboardModule:
         database schema (PascalCase) to prevent errors.
         """
         # --- KPI QUERIES ---
+        kpis = _load_kpis()
+        kpi_row = kpis.iloc[0] if not kpis.empty else {}
 
-        # Today's Sales (FIXED: Assigned result to self.sales_today)
-        sales_df = fetch_data(
-            "SELECT SUM(GrandTotal) as total FROM sales_invoices WHERE InvoiceDate = CURDATE()"
-        )
-        self.sales_today = (
-            sales_df.iloc[0]["total"]
-            if not sales_df.empty and pd.notna(sales_df.iloc[0]["total"])
-            else 0
-        )
-
-        # Low Stock Items
-        low_stock_df = fetch_data(
-            "SELECT COUNT(*) as count FROM medicines WHERE StockQty < ReorderLevel"
-        )
-        self.low_stock_items = (
-            low_stock_df.iloc[0]["count"] if not low_stock_df.empty else 0
-        )
-
-        # Pending Invoices (FIXED: Corrected 'status' to 'Status')
-        pending_df = fetch_data(
-            "SELECT COUNT(*) as count FROM sales_invoices WHERE Status = 'Pending'"
-        )
-        self.pending_invoices = (
-            pending_df.iloc[0]["count"] if not pending_df.empty else 0
-        )
-
-        # New Customers (FIXED: Corrected 'created_at' to match customer schema)
-        new_cust_df = fetch_data(
-            "SELECT COUNT(*) as count FROM customers WHERE created_at >= CURDATE() - INTERVAL 7 DAY"
-        )
-        self.new_customers = (
-            new_cust_df.iloc[0]["count"] if not new_cust_df.empty else 0
-        )
+        # Today's Sales (NULL when there are no invoices today)
+        sales_today = kpi_row.get("sales_today")
+        self.sales_today = sales_today if pd.notna(sales_today) else 0
+        self.low_stock_items = kpi_row.get("low_stock_items", 0)
+        self.pending_invoices = kpi_row.get("pending_invoices", 0)
+        self.new_customers = kpi_row.get("new_customers", 0)
 
         # --- CHART AND TABLE QUERIES ---
-
-        # Sales Trend (FIXED: Corrected 'InvoiceDate' and 'GrandTotal')
-        self.sales_trend_30_days = fetch_data(
-            """
-            SELECT InvoiceDate, SUM(GrandTotal) as daily_sales 
-            FROM sales_invoices 
-            WHERE InvoiceDate >= CURDATE() - INTERVAL 30 DAY 
-            GROUP BY InvoiceDate 
-            ORDER BY InvoiceDate ASC
-            """
-        )
-
-        # Low Stock Medicines Table
-        self.low_stock_medicines = fetch_data(
-            """
-            SELECT MedicineName, Category, StockQty, ReorderLevel
-            FROM medicines
-            WHERE StockQty < ReorderLevel
-            ORDER BY StockQty ASC
-            LIMIT 10
-            """
-        )
+        self.sales_trend_30_days = _load_sales_trend()
+        self.low_stock_medicines = _load_low_stock_medicines()
 
     def _display_kpis(self):
         """Displays the four main KPI cards with values fetched from the database."""
@@ -117,22 +142,10 @@ class DashboardModule:
                 unsafe_allow_html=True,
             )
             if not self.sales_trend_30_days.empty:
-                fig = px.area(
-                    self.sales_trend_30_days,
-                    x="InvoiceDate",
-                    y="daily_sales",
-                    markers=True,
-                    labels={"InvoiceDate": "Date", "daily_sales": "Total Sales (PKR)"},
-                )
-                fig.update_traces(
-                    line_color="#28a745", fillcolor="rgba(40, 167, 69, 0.2)"
-                )
-                fig.update_layout(
-                    margin=dict(l=20, r=20, t=20, b=20),
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    plot_bgcolor="rgba(0,0,0,0)",
+                st.plotly_chart(
+                    _build_sales_figure(self.sales_trend_30_days),
+                    use_container_width=True,
                 )
-                st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info("No sales data available for the last 30 days.")
             st.markdown("</div>", unsafe_allow_html=True)
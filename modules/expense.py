@@ -1,16 +1,197 @@
 import streamlit as st
 import pandas as pd
 from datetime import date, timedelta
-import plotly.express as px
-from db_connector import fetch_data, execute_query
+from db_connector import fetch_data, execute_query, execute_transaction
+import functools
+import hashlib
 import json
 import os
+import re
+import shutil
+import time
 
 # --- Constants for File Uploads ---
 ATTACHMENT_DIR = "attachments"
+ATTACHMENT_CHUNK_SIZE = 1 << 20  # 1 MiB
 if not os.path.exists(ATTACHMENT_DIR):
     os.makedirs(ATTACHMENT_DIR)
 
+# Cached expense reads expire after this many seconds
+EXPENSE_CACHE_TTL = 60
+
+# InnoDB ignores shorter words in FULLTEXT searches (innodb_ft_min_token_size)
+FULLTEXT_MIN_WORD_LEN = 3
+
+MAX_CHART_CATEGORIES = 10
+
+CATEGORIES = (
+    "Rent",
+    "Salary",
+    "Utilities",
+    "Purchase",
+    "Marketing",
+    "Travel",
+    "Other",
+)
+PAYMENT_METHODS = ("Cash", "Card", "Bank Transfer", "Online")
+FILTER_CATEGORIES = ("All",) + CATEGORIES
+FILTER_STATUSES = ("All", "Pending", "Approved", "Rejected")
+CATEGORY_INDEX = {c: i for i, c in enumerate(CATEGORIES)}
+PAYMENT_METHOD_INDEX = {m: i for i, m in enumerate(PAYMENT_METHODS)}
+FILTER_CATEGORY_INDEX = {c: i for i, c in enumerate(FILTER_CATEGORIES)}
+FILTER_STATUS_INDEX = {s: i for i, s in enumerate(FILTER_STATUSES)}
+
+
+def _save_attachment(uploaded_file):
+    """
+    Streams an uploaded file into ATTACHMENT_DIR in 1 MiB chunks and returns
+    its path. Stored names are prefixed with a SHA-256 of the content, so
+    re-uploading the same file reuses the stored copy, while a different file
+    under the same name always gets its own.
+    """
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    for chunk in iter(lambda: uploaded_file.read(ATTACHMENT_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    # Only the base name is kept, so uploads can't escape ATTACHMENT_DIR
+    file_name = os.path.basename(uploaded_file.name) or "attachment"
+    file_path = os.path.join(ATTACHMENT_DIR, f"{digest.hexdigest()[:16]}_{file_name}")
+    if os.path.exists(file_path):
+        return file_path
+
+    uploaded_file.seek(0)
+    with open(file_path, "wb", buffering=ATTACHMENT_CHUNK_SIZE) as f:
+        shutil.copyfileobj(uploaded_file, f, ATTACHMENT_CHUNK_SIZE)
+    return file_path
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_attachments(raw):
+    """
+    Parses the Attachments JSON column into a tuple of paths. Memoized on the
+    raw string, so re-rendering the same expense form doesn't re-parse it.
+    """
+    if not isinstance(raw, str) or not raw:
+        return ()
+    return tuple(json.loads(raw))
+
+
+def _build_expense_filter(filters):
+    """
+    Builds the WHERE clause and params for the sidebar filters. The result is
+    hashable, so it doubles as the cache key for _load_expenses.
+    """
+    clauses, params = [], []
+
+    # Date Range Filter
+    start_date, end_date = filters["date_range"]
+    clauses.append("ExpenseDate BETWEEN %s AND %s")
+    params.extend([start_date, end_date])
+
+    # Category Filter
+    if filters["category"] != "All":
+        clauses.append("Category = %s")
+        params.append(filters["category"])
+
+    # Approval Status Filter
+    if filters["status"] != "All":
+        clauses.append("ApprovalStatus = %s")
+        params.append(filters["status"])
+
+    # Search Term Filter: FULLTEXT prefix match on every word (uses the
+    # idx_exp_desc_paidto index); LIKE only for words below the token size
+    words = re.findall(r"\w+", filters["search_term"])
+    if words and min(len(w) for w in words) >= FULLTEXT_MIN_WORD_LEN:
+        clauses.append("MATCH(Description, PaidTo) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(" ".join(f"+{w}*" for w in words))
+    elif filters["search_term"]:
+        clauses.append("(Description LIKE %s OR PaidTo LIKE %s)")
+        params.extend([f"%{filters['search_term']}%", f"%{filters['search_term']}%"])
+
+    return f" WHERE {' AND '.join(clauses)}", tuple(params)
+
+
+@st.cache_data(ttl=EXPENSE_CACHE_TTL, show_spinner=False)
+def _load_expenses(where, params):
+    """
+    Fetches the filtered expenses, indexed by ExpenseID for direct lookups,
+    with the time they were read so local changes can be matched against it.
+    """
+    expenses = fetch_data(
+        f"SELECT * FROM expenses{where} ORDER BY ExpenseDate DESC", params
+    )
+    if not expenses.empty:
+        expenses = expenses.set_index("ExpenseID", drop=False)
+    return expenses, time.time()
+
+
+@st.cache_data(ttl=EXPENSE_CACHE_TTL, show_spinner=False)
+def _load_expense_kpis(where, params):
+    """Aggregates the KPI cards in SQL for the same filters as the list."""
+    kpis = fetch_data(
+        f"""
+        SELECT COALESCE(SUM(Amount), 0) AS total,
+               COALESCE(SUM(ApprovalStatus = 'Pending'), 0) AS pending,
+               (SELECT Category FROM expenses{where}
+                GROUP BY Category ORDER BY SUM(Amount) DESC LIMIT 1) AS top_category
+        FROM expenses{where}
+        """,
+        params + params,
+    )
+    if kpis.empty:
+        return {"total": 0.0, "pending": 0, "top_category": None}
+    row = kpis.iloc[0]
+    return {
+        "total": float(row["total"]),
+        "pending": int(row["pending"]),
+        "top_category": row["top_category"],
+    }
+
+
+def _clear_expense_cache():
+    """Invalidates cached expense reads after a write."""
+    _load_expenses.clear()
+    _load_expense_kpis.clear()
+    st.session_state.expense_local_changes = {}
+
+
+def _record_local_change(expense_id, changes):
+    """
+    Records a single-row write (changes=None for a delete) so the cached list
+    can be patched in memory instead of refetched. Only the cheap KPI
+    aggregate is invalidated; the list picks the row up on its next TTL refresh.
+    """
+    st.session_state.expense_local_changes[expense_id] = (time.time(), changes)
+    _load_expense_kpis.clear()
+
+
+def _apply_local_changes(expenses, loaded_at):
+    """
+    Overlays this session's single-row writes that are newer than the cached
+    list. Once a TTL has passed every cached list already includes a write,
+    so its entry is dropped and later changes by others show through.
+    """
+    now = time.time()
+    local_changes = {
+        eid: (written_at, changes)
+        for eid, (written_at, changes) in st.session_state.expense_local_changes.items()
+        if now - written_at < EXPENSE_CACHE_TTL
+    }
+    st.session_state.expense_local_changes = local_changes
+    pending = {
+        eid: changes
+        for eid, (written_at, changes) in local_changes.items()
+        if written_at > loaded_at
+    }
+    if expenses.empty or not pending:
+        return expenses
+    deleted = [eid for eid, changes in pending.items() if changes is None]
+    expenses = expenses.drop(index=deleted, errors="ignore")
+    for eid, changes in pending.items():
+        if changes is not None and eid in expenses.index:
+            expenses.loc[eid, list(changes)] = list(changes.values())
+    return expenses
+
 
 class ExpensesModule:
     """
@@ -21,6 +202,7 @@ class ExpensesModule:
     def __init__(self):
         """Initializes session state keys for managing the UI."""
         st.session_state.setdefault("editing_expense_id", None)
+        st.session_state.setdefault("expense_local_changes", {})
         st.session_state.setdefault("expense_user_role", "Admin")  # For demo purposes
         st.session_state.setdefault(
             "expense_filters",
@@ -33,38 +215,15 @@ class ExpensesModule:
         )
 
     def _get_filtered_data(self):
-        """
-        Fetches and filters expense data from the database based on sidebar filters.
-        This method uses dynamic SQL for efficient querying.
-        """
-        filters = st.session_state.expense_filters
-        query = "SELECT * FROM expenses WHERE 1=1"
-        params = []
-
-        # Date Range Filter
-        start_date, end_date = filters["date_range"]
-        query += " AND ExpenseDate BETWEEN %s AND %s"
-        params.extend([start_date, end_date])
-
-        # Category Filter
-        if filters["category"] != "All":
-            query += " AND Category = %s"
-            params.append(filters["category"])
-
-        # Approval Status Filter
-        if filters["status"] != "All":
-            query += " AND ApprovalStatus = %s"
-            params.append(filters["status"])
-
-        # Search Term Filter
-        if filters["search_term"]:
-            query += " AND (Description LIKE %s OR PaidTo LIKE %s)"
-            params.extend(
-                [f"%{filters['search_term']}%", f"%{filters['search_term']}%"]
-            )
-
-        query += " ORDER BY ExpenseDate DESC"
-        self.expenses_data = fetch_data(query, tuple(params))
+        """Loads the expenses matching the sidebar filters (cached per filter set)."""
+        where, params = _build_expense_filter(st.session_state.expense_filters)
+        expenses = _apply_local_changes(*_load_expenses(where, params))
+        # A locally approved/rejected row may no longer match the status filter
+        status = st.session_state.expense_filters["status"]
+        if status != "All" and not expenses.empty:
+            expenses = expenses[expenses["ApprovalStatus"] == status]
+        self.expenses_data = expenses
+        self.kpis = _load_expense_kpis(where, params)
 
     def render(self):
         """Main render method that routes to the correct view (list or form)."""
@@ -100,31 +259,13 @@ class ExpensesModule:
         )
         filters["category"] = st.sidebar.selectbox(
             "Category",
-            [
-                "All",
-                "Rent",
-                "Salary",
-                "Utilities",
-                "Purchase",
-                "Marketing",
-                "Travel",
-                "Other",
-            ],
-            index=[
-                "All",
-                "Rent",
-                "Salary",
-                "Utilities",
-                "Purchase",
-                "Marketing",
-                "Travel",
-                "Other",
-            ].index(filters["category"]),
+            FILTER_CATEGORIES,
+            index=FILTER_CATEGORY_INDEX[filters["category"]],
         )
         filters["status"] = st.sidebar.selectbox(
             "Approval Status",
-            ["All", "Pending", "Approved", "Rejected"],
-            index=["All", "Pending", "Approved", "Rejected"].index(filters["status"]),
+            FILTER_STATUSES,
+            index=FILTER_STATUS_INDEX[filters["status"]],
         )
 
     def _render_main_view(self):
@@ -142,45 +283,71 @@ class ExpensesModule:
             st.info("No expense data available for the selected filters.")
             return
 
-        total_expenses = self.expenses_data["Amount"].sum()
-        pending_count = len(
-            self.expenses_data[self.expenses_data["ApprovalStatus"] == "Pending"]
-        )
-        highest_category = (
-            self.expenses_data.groupby("Category")["Amount"].sum().idxmax()
-        )
-
         kpi_cols = st.columns(3)
-        kpi_cols[0].metric("Total Expenses", f"Rs {total_expenses:,.2f}")
-        kpi_cols[1].metric("Pending Approvals", f"{pending_count} Expenses")
-        kpi_cols[2].metric("Top Spending Category", highest_category)
+        kpi_cols[0].metric("Total Expenses", f"Rs {self.kpis['total']:,.2f}")
+        kpi_cols[1].metric("Pending Approvals", f"{self.kpis['pending']} Expenses")
+        kpi_cols[2].metric("Top Spending Category", self.kpis["top_category"])
 
     def _render_charts(self):
-        """Renders interactive charts for expense analytics."""
+        """
+        Renders the expense analytics with native Streamlit charts; the Plotly
+        versions are only built when the user asks for interactive charts.
+        """
         st.subheader("Expense Analytics")
         if self.expenses_data.empty:
             return
 
+        category_data = (
+            self.expenses_data.groupby("Category")["Amount"]
+            .sum()
+            .sort_values(ascending=False)
+        )
+        # Keep the chart readable: the long tail is folded into "Other"
+        if len(category_data) > MAX_CHART_CATEGORIES:
+            tail = category_data.iloc[MAX_CHART_CATEGORIES - 1 :].sum()
+            category_data = pd.concat(
+                [
+                    category_data.head(MAX_CHART_CATEGORIES - 1),
+                    pd.Series({"Other": tail}),
+                ]
+            )
+        category_data = category_data.rename_axis("Category").reset_index(name="Amount")
+        method_data = (
+            self.expenses_data.groupby("PaymentMethod")["Amount"].sum().reset_index()
+        )
+
+        if st.toggle("Interactive charts", key="expense_interactive_charts"):
+            self._render_plotly_charts(category_data, method_data)
+            return
+
         chart_cols = st.columns(2)
         with chart_cols[0]:
-            category_data = (
-                self.expenses_data.groupby("Category")["Amount"].sum().reset_index()
-            )
-            fig_cat = px.pie(
+            st.write("**Expenses by Category**")
+            st.bar_chart(category_data, x="Category", y="Amount", horizontal=True)
+        with chart_cols[1]:
+            st.write("**Expenses by Payment Method**")
+            st.bar_chart(method_data, x="PaymentMethod", y="Amount")
+
+    def _render_plotly_charts(self, category_data, method_data):
+        """Renders the interactive Plotly drill-down charts."""
+        # Imported here so module import and non-chart reruns skip Plotly
+        import plotly.express as px
+
+        chart_cols = st.columns(2)
+        with chart_cols[0]:
+            fig_cat = px.bar(
                 category_data,
-                names="Category",
-                values="Amount",
+                x="Amount",
+                y="Category",
+                orientation="h",
                 title="Expenses by Category",
-                hole=0.3,
+            )
+            fig_cat.update_layout(
+                transition_duration=0, yaxis={"categoryorder": "total ascending"}
             )
             st.plotly_chart(fig_cat, use_container_width=True)
 
         with chart_cols[1]:
-            method_data = (
-                self.expenses_data.groupby("PaymentMethod")["Amount"]
-                .sum()
-                .reset_index()
-            )
             fig_method = px.bar(
                 method_data,
                 x="PaymentMethod",
@@ -204,67 +371,145 @@ class ExpensesModule:
             st.warning("No expenses match the current filters.")
             return
 
-        for _, expense in self.expenses_data.iterrows():
-            self._render_expense_row(expense)
+        # One grid; selecting a row shows the action bar below it
+        event = st.dataframe(
+            self.expenses_data,
+            use_container_width=True,
+            hide_index=True,
+            key="expenses_table",
+            on_select="rerun",
+            selection_mode="single-row",
+            column_order=(
+                "ExpenseDate",
+                "Description",
+                "Category",
+                "PaidTo",
+                "Amount",
+                "PaymentMethod",
+                "ApprovalStatus",
+            ),
+            column_config={
+                "ExpenseDate": st.column_config.DateColumn(
+                    "Date", format="MMM DD, YYYY"
+                ),
+                "PaidTo": "Paid To",
+                "Amount": st.column_config.NumberColumn("Amount", format="Rs %.2f"),
+                "PaymentMethod": "Method",
+                "ApprovalStatus": "Status",
+            },
+        )
+        if event.selection.rows:
+            self._render_expense_actions(
+                self.expenses_data.iloc[event.selection.rows[0]]
+            )
+        if st.session_state.expense_user_role in ["Admin", "Manager"]:
+            self._render_bulk_expense_form()
+
+    def _render_bulk_expense_form(self):
+        """
+        Renders bulk approve/reject/delete in a form, so any number of expenses
+        is written in one transaction with a single rerun.
+        """
+        descriptions = self.expenses_data["Description"]
+        with st.form("expenses_bulk"):
+            selected_ids = st.multiselect(
+                "Bulk Actions: Select Expenses",
+                options=descriptions.index.tolist(),
+                format_func=lambda eid: f"{descriptions[eid]} (#{eid})",
+            )
+            c1, c2, c3 = st.columns(3)
+            approve_clicked = c1.form_submit_button("👍 Approve Selected")
+            reject_clicked = c2.form_submit_button("👎 Reject Selected")
+            delete_clicked = c3.form_submit_button("🗑️ Delete Selected")
 
-    def _render_expense_row(self, expense):
-        """Renders a single row for an expense."""
+        if not (approve_clicked or reject_clicked or delete_clicked):
+            return
+        if not selected_ids:
+            st.warning("Please select at least one expense.")
+            return
+
+        if delete_clicked:
+            queries = [
+                ("DELETE FROM expenses WHERE ExpenseID = %s", (int(eid),))
+                for eid in selected_ids
+            ]
+        else:
+            # Only pending expenses change; already decided ones are left alone
+            status = "Approved" if approve_clicked else "Rejected"
+            queries = [
+                (
+                    "UPDATE expenses SET ApprovalStatus=%s, ApprovedBy=%s WHERE ExpenseID=%s AND ApprovalStatus='Pending'",
+                    (status, "Admin User", int(eid)),
+                )
+                for eid in selected_ids
+            ]
+        if execute_transaction(queries):
+            _clear_expense_cache()
+            st.toast(f"{len(selected_ids)} expense(s) updated.", icon="✅")
+            st.rerun()
+
+    def _render_expense_actions(self, expense):
+        """Renders the action bar for the expense selected in the grid."""
+        expense_id = int(expense["ExpenseID"])
         status_colors = {"Pending": "orange", "Approved": "green", "Rejected": "red"}
         status_color = status_colors.get(expense["ApprovalStatus"], "gray")
+        st.markdown(
+            f"**Selected:** {expense['Description']} &nbsp; "
+            f"Rs {expense['Amount']:,.2f} &nbsp; "
+            f":{status_color}[{expense['ApprovalStatus']}]"
+        )
 
-        st.markdown("---")
-        main_cols = st.columns([3, 1.5, 1.5, 2])
-
-        with main_cols[0]:
-            st.markdown(f"**{expense['Description']}**")
-            st.caption(
-                f"Category: {expense['Category']} | Paid to: {expense.get('PaidTo', 'N/A')}"
-            )
-        with main_cols[1]:
-            st.markdown(f"**Amount:** Rs {expense['Amount']:,.2f}")
-            st.caption(f"Date: {expense['ExpenseDate'].strftime('%b %d, %Y')}")
-        with main_cols[2]:
-            st.markdown(f"**Status:** :{status_color}[{expense['ApprovalStatus']}]")
-            st.caption(f"Method: {expense['PaymentMethod']}")
-        with main_cols[3]:
-            action_cols = st.columns(4)
-            if action_cols[0].button(
-                "✏️", key=f"edit_{expense['ExpenseID']}", help="Edit"
+        action_cols = st.columns(4)
+        if action_cols[0].button(
+            "✏️ Edit", key=f"edit_{expense_id}", use_container_width=True
+        ):
+            st.session_state.editing_expense_id = expense_id
+            st.rerun()
+
+        if st.session_state.expense_user_role in ["Admin", "Manager"]:
+            if action_cols[1].button(
+                "🗑️ Delete",
+                key=f"del_{expense_id}",
+                use_container_width=True,
             ):
-                st.session_state.editing_expense_id = expense["ExpenseID"]
-                st.rerun()
-
-            if st.session_state.expense_user_role in ["Admin", "Manager"]:
-                if action_cols[1].button(
-                    "🗑️", key=f"del_{expense['ExpenseID']}", help="Delete"
+                # Placeholder for a confirmation modal
+                success, _ = execute_query(
+                    "DELETE FROM expenses WHERE ExpenseID = %s",
+                    (expense_id,),
+                )
+                if success:
+                    _record_local_change(expense_id, None)
+                    st.toast("Expense deleted!", icon="✅")
+                    st.rerun()
+
+            if expense["ApprovalStatus"] == "Pending":
+                if action_cols[2].button(
+                    "👍 Approve",
+                    key=f"appr_{expense_id}",
+                    use_container_width=True,
                 ):
-                    # Placeholder for a confirmation modal
-                    if execute_query(
-                        "DELETE FROM expenses WHERE ExpenseID = %s",
-                        (expense["ExpenseID"],),
-                    ):
-                        st.toast("Expense deleted!", icon="✅")
-                        st.rerun()
-
-                if expense["ApprovalStatus"] == "Pending":
-                    if action_cols[2].button(
-                        "👍", key=f"appr_{expense['ExpenseID']}", help="Approve"
-                    ):
-                        execute_query(
-                            "UPDATE expenses SET ApprovalStatus='Approved', ApprovedBy=%s WHERE ExpenseID=%s",
-                            ("Admin User", expense["ExpenseID"]),
-                        )
-                        st.toast("Expense Approved!", icon="👍")
-                        st.rerun()
-                    if action_cols[3].button(
-                        "👎", key=f"rej_{expense['ExpenseID']}", help="Reject"
-                    ):
-                        execute_query(
-                            "UPDATE expenses SET ApprovalStatus='Rejected', ApprovedBy=%s WHERE ExpenseID=%s",
-                            ("Admin User", expense["ExpenseID"]),
-                        )
-                        st.toast("Expense Rejected.", icon="👎")
-                        st.rerun()
+                    self._set_approval_status(expense_id, "Approved")
+                    st.toast("Expense Approved!", icon="👍")
+                    st.rerun()
+                if action_cols[3].button(
+                    "👎 Reject",
+                    key=f"rej_{expense_id}",
+                    use_container_width=True,
+                ):
+                    self._set_approval_status(expense_id, "Rejected")
+                    st.toast("Expense Rejected.", icon="👎")
+                    st.rerun()
+
+    def _set_approval_status(self, expense_id, status):
+        """Writes an approval decision and patches the cached list locally."""
+        success, _ = execute_query(
+            "UPDATE expenses SET ApprovalStatus=%s, ApprovedBy=%s WHERE ExpenseID=%s",
+            (status, "Admin User", expense_id),
+        )
+        if success:
+            _record_local_change(
+                expense_id, {"ApprovalStatus": status, "ApprovedBy": "Admin User"}
+            )
 
     def _render_expense_form(self, expense_id):
         """Renders a form for adding or editing an expense."""
@@ -272,11 +517,7 @@ class ExpensesModule:
         title = "Edit Expense" if is_edit else "➕ Add New Expense"
         expense_data = {}
         if is_edit:
-            expense_data = (
-                self.expenses_data[self.expenses_data["ExpenseID"] == expense_id]
-                .iloc[0]
-                .to_dict()
-            )
+            expense_data = self.expenses_data.loc[expense_id].to_dict()
 
         with st.form("expense_form"):
             st.subheader(title)
@@ -287,24 +528,8 @@ class ExpensesModule:
             )
             category = st.selectbox(
                 "Category*",
-                [
-                    "Rent",
-                    "Salary",
-                    "Utilities",
-                    "Purchase",
-                    "Marketing",
-                    "Travel",
-                    "Other",
-                ],
-                index=[
-                    "Rent",
-                    "Salary",
-                    "Utilities",
-                    "Purchase",
-                    "Marketing",
-                    "Travel",
-                    "Other",
-                ].index(expense_data.get("Category", "Utilities")),
+                CATEGORIES,
+                index=CATEGORY_INDEX[expense_data.get("Category", "Utilities")],
             )
 
             form_cols1 = st.columns(3)
@@ -332,10 +557,8 @@ class ExpensesModule:
             )
             payment_method = form_cols2[1].selectbox(
                 "Payment Method",
-                ["Cash", "Card", "Bank Transfer", "Online"],
-                index=["Cash", "Card", "Bank Transfer", "Online"].index(
-                    expense_data.get("PaymentMethod", "Card")
-                ),
+                PAYMENT_METHODS,
+                index=PAYMENT_METHOD_INDEX[expense_data.get("PaymentMethod", "Card")],
             )
             paid_to = st.text_input(
                 "Paid To / Vendor", value=expense_data.get("PaidTo", "")
@@ -346,7 +569,9 @@ class ExpensesModule:
             uploaded_files = st.file_uploader(
                 "Upload receipts or invoices", accept_multiple_files=True
             )
-            existing_attachments = json.loads(expense_data.get("Attachments", "[]"))
+            existing_attachments = list(
+                _parse_attachments(expense_data.get("Attachments"))
+            )
             if existing_attachments:
                 st.write("Current Attachments:")
                 for att in existing_attachments:
@@ -367,9 +592,7 @@ class ExpensesModule:
                     # Handle file saving
                     new_attachment_paths = existing_attachments
                     for uploaded_file in uploaded_files:
-                        file_path = os.path.join(ATTACHMENT_DIR, uploaded_file.name)
-                        with open(file_path, "wb") as f:
-                            f.write(uploaded_file.getbuffer())
+                        file_path = _save_attachment(uploaded_file)
                         if file_path not in new_attachment_paths:
                             new_attachment_paths.append(file_path)
 
@@ -392,6 +615,7 @@ class ExpensesModule:
                         query = "INSERT INTO expenses (Description, Category, Amount, ExpenseDate, PaymentMethod, PaidTo, Attachments, TaxRate, TaxAmount, Notes) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
 
                     if execute_query(query, params):
+                        _clear_expense_cache()
                         st.success(
                             f"Expense {'updated' if is_edit else 'saved'} successfully!"
                         )
@@ -1,9 +1,80 @@
 import streamlit as st
 import pandas as pd
-from datetime import date, timedelta
+import numpy as np
+from datetime import date
 from db_connector import fetch_data, execute_query
 
 
+ITEMS_PER_PAGE = 25
+EXPIRY_WARNING_DAYS = 30
+CATEGORY_COLUMNS = ("Category", "Brand", "SupplierName")
+
+
+# Stock is also written by the sales and purchase modules, so keep the TTL short
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_inventory():
+    """
+    Fetches only the columns the view uses. Low-cardinality text columns are
+    stored as categories and dates are parsed once, here, per cache fill.
+    The frame is indexed by MedicineID for direct lookups.
+
+    Also returns the row order that sorts ExpiryDate and the sorted dates,
+    so expiry range filters are two binary searches instead of a full scan.
+    """
+    inventory = fetch_data(
+        """
+        SELECT m.MedicineID, m.MedicineName, m.Category, m.Brand, m.SupplierID,
+               s.SupplierName, m.StockQty, m.PurchasePrice, m.ExpiryDate
+        FROM medicines m LEFT JOIN suppliers s ON m.SupplierID = s.SupplierID
+        ORDER BY m.MedicineName
+        """
+    )
+    if inventory.empty:
+        return inventory, np.array([], dtype=np.intp), np.array([], "datetime64[ns]")
+
+    for col in CATEGORY_COLUMNS:
+        inventory[col] = inventory[col].astype("category")
+    inventory["ExpiryDate"] = pd.to_datetime(inventory["ExpiryDate"], cache=True)
+    inventory = inventory.set_index("MedicineID", drop=False)
+
+    # NaT sorts last, so items without an expiry never fall inside a range
+    expiry = inventory["ExpiryDate"].to_numpy()
+    expiry_order = np.argsort(expiry, kind="stable")
+    return inventory, expiry_order, expiry[expiry_order]
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_inventory_kpis():
+    """Aggregates the KPI cards in SQL instead of over the full frame."""
+    kpis = fetch_data(
+        f"""
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(StockQty < 10), 0) AS low,
+               COALESCE(SUM(StockQty = 0), 0) AS out_of_stock,
+               COALESCE(SUM(ExpiryDate BETWEEN CURDATE() AND
+                   CURDATE() + INTERVAL {EXPIRY_WARNING_DAYS} DAY), 0) AS expiring,
+               COALESCE(SUM(StockQty * PurchasePrice), 0) AS stock_value
+        FROM medicines
+        """
+    )
+    if kpis.empty:
+        return {"total": 0, "low": 0, "out_of_stock": 0, "expiring": 0, "value": 0}
+    row = kpis.iloc[0]
+    return {
+        "total": int(row["total"]),
+        "low": int(row["low"]),
+        "out_of_stock": int(row["out_of_stock"]),
+        "expiring": int(row["expiring"]),
+        "value": float(row["stock_value"]),
+    }
+
+
+def _clear_inventory_cache():
+    """Invalidates cached inventory reads after a stock change."""
+    _load_inventory.clear()
+    _load_inventory_kpis.clear()
+
+
 class InventoryModule:
     """
     Manages all inventory stock levels with a premium UI, stock adjustments, KPIs,
@@ -15,48 +86,31 @@ class InventoryModule:
         """Initializes session state keys for the module."""
         st.session_state.setdefault("adjusting_stock_item_id", None)
         st.session_state.setdefault("viewing_inventory_kpi", None)
+        st.session_state.setdefault("inventory_page_number", 1)
 
     def _get_data(self):
         """
-        Fetches all necessary data from the database, calculates KPIs, and
-        computes the total stock value.
+        Fetches the inventory list and the KPI aggregates (computed in SQL),
+        and adds the per-item stock value used by the analytics charts.
         """
-        self.inventory = fetch_data(
-            "SELECT m.*, s.SupplierName FROM medicines m LEFT JOIN suppliers s ON m.SupplierID = s.SupplierID ORDER BY m.MedicineName"
-        )
+        self.inventory, self._expiry_order, self._expiry_sorted = _load_inventory()
+        kpis = _load_inventory_kpis()
+        self.kpi_total_items = kpis["total"]
+        self.kpi_low_stock_count = kpis["low"]
+        self.kpi_out_of_stock_count = kpis["out_of_stock"]
+        self.kpi_expiring_soon_count = kpis["expiring"]
+        self.kpi_total_stock_value = kpis["value"]
 
         if self.inventory is not None and not self.inventory.empty:
-            self.inventory["ExpiryDate"] = pd.to_datetime(self.inventory["ExpiryDate"])
-
-            # --- Main KPIs ---
-            self.kpi_total_items = len(self.inventory)
-            self.low_stock_df = self.inventory[self.inventory["StockQty"] < 10]
-            self.kpi_low_stock_count = len(self.low_stock_df)
-            self.out_of_stock_df = self.inventory[self.inventory["StockQty"] == 0]
-            self.kpi_out_of_stock_count = len(self.out_of_stock_df)
-
-            expiring_soon_date = pd.to_datetime(date.today() + timedelta(days=30))
-            self.expiring_soon_df = self.inventory[
-                (self.inventory["ExpiryDate"] <= expiring_soon_date)
-                & (self.inventory["ExpiryDate"] >= pd.to_datetime(date.today()))
-            ]
-            self.kpi_expiring_soon_count = len(self.expiring_soon_df)
-
-            # --- Value KPI ---
             self.inventory["StockValue"] = (
                 self.inventory["StockQty"] * self.inventory["PurchasePrice"]
             )
-            self.kpi_total_stock_value = self.inventory["StockValue"].sum()
-        else:
-            self.kpi_total_items = self.kpi_low_stock_count = (
-                self.kpi_expiring_soon_count
-            ) = self.kpi_out_of_stock_count = self.kpi_total_stock_value = 0
-            self.low_stock_df = self.expiring_soon_df = self.out_of_stock_df = (
-                pd.DataFrame()
-            )
 
     def render(self):
         """Main render method that routes to the correct view (list or form)."""
+        # Expiry cut-offs, computed once per render and shared by every view
+        self._today = pd.Timestamp(date.today())
+        self._soon = self._today + pd.Timedelta(days=EXPIRY_WARNING_DAYS)
         self._get_data()
         st.title("📦 Inventory Stock Management")
 
@@ -116,16 +170,39 @@ class InventoryModule:
             self._display_filtered_inventory()
             self._display_analytics()
 
+    def _expiry_position(self, when, side="left"):
+        """Binary-searches the sorted expiry dates for a timestamp."""
+        return np.searchsorted(self._expiry_sorted, when.to_datetime64(), side)
+
+    def _expiry_mask(self, start, stop):
+        """Marks the items at sorted-expiry positions [start, stop)."""
+        mask = np.zeros(len(self.inventory), dtype=bool)
+        mask[self._expiry_order[start:stop]] = True
+        return mask
+
+    def _expiring_soon_mask(self):
+        """Items expiring between today and the warning cut-off (inclusive)."""
+        return self._expiry_mask(
+            self._expiry_position(self._today),
+            self._expiry_position(self._soon, side="right"),
+        )
+
     def _display_kpi_drilldown(self):
         """Displays the filtered list when a KPI is clicked."""
-        kpi_map = {
-            "low_stock": (self.low_stock_df, "Items with Low Stock"),
-            "expiring_soon": (self.expiring_soon_df, "Items Expiring Soon"),
-            "out_of_stock": (self.out_of_stock_df, "Out of Stock Items"),
-        }
-        df, title = kpi_map.get(
-            st.session_state.viewing_inventory_kpi, (pd.DataFrame(), "Inventory")
-        )
+        inventory = self.inventory
+        kpi = st.session_state.viewing_inventory_kpi
+        # Only the requested drill-down list is built
+        if inventory.empty:
+            df, title = inventory, "Inventory"
+        elif kpi == "low_stock":
+            df, title = inventory[inventory["StockQty"] < 10], "Items with Low Stock"
+        elif kpi == "expiring_soon":
+            df = inventory[self._expiring_soon_mask()]
+            title = "Items Expiring Soon"
+        elif kpi == "out_of_stock":
+            df, title = inventory[inventory["StockQty"] == 0], "Out of Stock Items"
+        else:
+            df, title = pd.DataFrame(), "Inventory"
 
         st.subheader(title)
         if st.button("⬅️ Back to Full Inventory"):
@@ -156,112 +233,139 @@ class InventoryModule:
         selected_expiry = st.sidebar.selectbox("Filter by Expiry Status", expiry_status)
 
         # --- Filtering Logic ---
-        filtered_df = self.inventory.copy()
-        if search_term:
-            filtered_df = filtered_df[
-                filtered_df["MedicineName"].str.contains(
-                    search_term, case=False, na=False
-                )
-            ]
+        # Each active filter narrows one boolean mask, cheapest first; the
+        # frame is sliced once
+        inventory = self.inventory
+        mask = np.ones(len(inventory), dtype=bool)
         if selected_category != "All":
-            filtered_df = filtered_df[filtered_df["Category"] == selected_category]
+            mask &= (inventory["Category"] == selected_category).to_numpy()
         if selected_supplier != "All":
-            filtered_df = filtered_df[filtered_df["SupplierName"] == selected_supplier]
+            mask &= (inventory["SupplierName"] == selected_supplier).to_numpy()
         if selected_stock == "Low Stock":
-            filtered_df = filtered_df[filtered_df["StockQty"] < 10]
+            mask &= inventory["StockQty"].to_numpy() < 10
         elif selected_stock == "Out of Stock":
-            filtered_df = filtered_df[filtered_df["StockQty"] == 0]
+            mask &= inventory["StockQty"].to_numpy() == 0
         if selected_expiry == "Expiring Soon":
-            exp_soon_date = pd.to_datetime(date.today() + timedelta(days=30))
-            filtered_df = filtered_df[
-                (filtered_df["ExpiryDate"] <= exp_soon_date)
-                & (filtered_df["ExpiryDate"] >= pd.to_datetime(date.today()))
-            ]
+            mask &= self._expiring_soon_mask()
         elif selected_expiry == "Expired":
-            filtered_df = filtered_df[
-                filtered_df["ExpiryDate"] < pd.to_datetime(date.today())
-            ]
+            mask &= self._expiry_mask(0, self._expiry_position(self._today))
+        # The substring scan runs last, and only over rows still in the mask
+        if search_term:
+            candidates = np.flatnonzero(mask)
+            hits = (
+                inventory["MedicineName"]
+                .iloc[candidates]
+                .str.contains(search_term, case=False, na=False, regex=False)
+                .to_numpy()
+            )
+            mask[candidates[~hits]] = False
+        filtered_df = inventory[mask]
 
         st.subheader("Inventory Details")
         if not filtered_df.empty:
-            st.download_button(
-                label="📥 Export as CSV",
-                data=filtered_df.to_csv(index=False).encode("utf-8"),
-                file_name="inventory_report.csv",
-                mime="text/csv",
+            # CSV is only serialized when the user asks for it
+            if st.button("Prepare CSV Export"):
+                st.download_button(
+                    label="📥 Export as CSV",
+                    data=filtered_df.to_csv(index=False).encode("utf-8"),
+                    file_name="inventory_report.csv",
+                    mime="text/csv",
+                )
+
+            # Rich rows are only built for the current page
+            total_pages = (len(filtered_df) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+            page_number = st.number_input(
+                "Page",
+                min_value=1,
+                max_value=total_pages,
+                value=min(st.session_state.inventory_page_number, total_pages),
+                key="inv_page_selector",
             )
-            for _, item in filtered_df.iterrows():
+            st.session_state.inventory_page_number = page_number
+            start = (page_number - 1) * ITEMS_PER_PAGE
+            page_df = self._add_row_markup(
+                filtered_df.iloc[start : start + ITEMS_PER_PAGE]
+            )
+            for item in page_df.itertuples(index=False):
                 self._render_inventory_row(item)
         else:
             st.warning("No items match your search criteria.")
 
-    def _render_inventory_row(self, item):
-        """Renders a single inventory item's row with alerts and actions."""
-        st.markdown("---")
-
-        # --- Alerts ---
-        alerts = []
-        if item["StockQty"] < 10 and item["StockQty"] > 0:
-            alerts.append("⚠️ Low Stock")
-        days_left = (item["ExpiryDate"].date() - date.today()).days
-        if 0 <= days_left <= 30:
-            alerts.append("⏳ Expiring Soon")
-
-        row_cols = st.columns([3, 2, 2, 2, 2])
-
-        name_display = f"**{item['MedicineName']}**"
-        if alerts:
-            name_display += (
-                f"  <small style='color:orange;'>{' | '.join(alerts)}</small>"
-            )
-        row_cols[0].markdown(name_display, unsafe_allow_html=True)
-        row_cols[0].caption(
-            f"{item.get('Category', 'N/A')} | {item.get('Brand', 'N/A')}"
+    def _add_row_markup(self, page_df):
+        """
+        Builds the alert and status-tag HTML for a page of items in one
+        vectorized pass, so the row renderer does no per-row branching.
+        """
+        stock = page_df["StockQty"].to_numpy()
+        days_left = (page_df["ExpiryDate"] - self._today).dt.days.to_numpy()
+        low = (stock > 0) & (stock < 10)
+        expiring = (days_left >= 0) & (days_left <= EXPIRY_WARNING_DAYS)
+
+        alerts = np.select(
+            [low & expiring, low, expiring],
+            ["⚠️ Low Stock | ⏳ Expiring Soon", "⚠️ Low Stock", "⏳ Expiring Soon"],
+            default="",
         )
-
-        stock_qty = item["StockQty"]
-        stock_class = (
-            "status-ok"
-            if stock_qty >= 10
-            else ("status-expiring" if 0 < stock_qty < 10 else "status-low")
+        alerts_html = np.where(
+            alerts != "",
+            "  <small style='color:orange;'>" + alerts.astype(object) + "</small>",
+            "",
         )
-        row_cols[1].markdown(
-            f"Stock: <span class='status-tag {stock_class}'>{stock_qty}</span>",
-            unsafe_allow_html=True,
+        stock_class = np.select(
+            [stock >= 10, stock > 0], ["status-ok", "status-expiring"], "status-low"
         )
-
-        exp_date = item["ExpiryDate"].date()
-        exp_class = (
-            "status-ok"
-            if days_left > 30
-            else ("status-expiring" if 0 <= days_left <= 30 else "status-low")
+        exp_class = np.select(
+            [days_left > EXPIRY_WARNING_DAYS, days_left >= 0],
+            ["status-ok", "status-expiring"],
+            "status-low",
         )
-        row_cols[2].markdown(
-            f"Expiry: <span class='status-tag {exp_class}'>{exp_date.strftime('%b %d, %Y')}</span>",
-            unsafe_allow_html=True,
+        exp_text = page_df["ExpiryDate"].dt.strftime("%b %d, %Y").fillna("N/A")
+
+        return page_df.assign(
+            NameHtml="**" + page_df["MedicineName"].astype(str) + "**" + alerts_html,
+            StockHtml="Stock: <span class='status-tag "
+            + stock_class.astype(object)
+            + "'>"
+            + page_df["StockQty"].astype(str)
+            + "</span>",
+            ExpiryHtml="Expiry: <span class='status-tag "
+            + exp_class.astype(object)
+            + "'>"
+            + exp_text
+            + "</span>",
         )
 
+    def _render_inventory_row(self, item):
+        """Renders one record from _add_row_markup with its precomputed tags."""
+        st.markdown("---")
+        row_cols = st.columns([3, 2, 2, 2, 2])
+
+        row_cols[0].markdown(item.NameHtml, unsafe_allow_html=True)
+        row_cols[0].caption(f"{item.Category} | {item.Brand}")
+        row_cols[1].markdown(item.StockHtml, unsafe_allow_html=True)
+        row_cols[2].markdown(item.ExpiryHtml, unsafe_allow_html=True)
         row_cols[3].markdown(
-            f"**Supplier**<br>{item.get('SupplierName', 'N/A')}", unsafe_allow_html=True
+            f"**Supplier**<br>{item.SupplierName}", unsafe_allow_html=True
         )
 
         with row_cols[4]:
             if st.button(
                 "⚙️ Adjust Stock",
-                key=f"adjust_inv_{item['MedicineID']}",
+                key=f"adjust_inv_{item.MedicineID}",
                 use_container_width=True,
             ):
-                st.session_state.adjusting_stock_item_id = item["MedicineID"]
+                st.session_state.adjusting_stock_item_id = item.MedicineID
                 st.rerun()
 
     def _render_stock_adjustment_form(self, item_id):
         """Renders the form for adjusting the stock of a single item."""
-        item_data = self.inventory[self.inventory["MedicineID"] == item_id].iloc[0]
+        item_name = self.inventory.at[item_id, "MedicineName"]
+        current_stock = int(self.inventory.at[item_id, "StockQty"])
 
         with st.form(key="stock_adjustment_form"):
-            st.subheader(f"Adjust Stock for: {item_data['MedicineName']}")
+            st.subheader(f"Adjust Stock for: {item_name}")
 
-            st.metric("Current Stock", int(item_data["StockQty"]))
+            st.metric("Current Stock", current_stock)
 
             adj_type = st.selectbox(
                 "Adjustment Type",
@@ -276,7 +380,6 @@ class InventoryModule:
             cancelled = st.form_submit_button("Cancel")
 
             if submitted:
-                current_stock = int(item_data["StockQty"])
                 new_stock = current_stock
 
                 if adj_type == "Add to Stock":
@@ -291,9 +394,8 @@ class InventoryModule:
                 else:
                     query = "UPDATE medicines SET StockQty = %s WHERE MedicineID = %s"
                     if execute_query(query, (int(new_stock), int(item_id))):
-                        st.success(
-                            f"Stock for '{item_data['MedicineName']}' updated to {new_stock}."
-                        )
+                        _clear_inventory_cache()
+                        st.success(f"Stock for '{item_name}' updated to {new_stock}.")
                         st.session_state.adjusting_stock_item_id = None
                         st.rerun()
             if cancelled:
@@ -310,7 +412,7 @@ class InventoryModule:
 
             # Stock Value by Supplier
             supplier_value = (
-                self.inventory.groupby("SupplierName")["StockValue"]
+                self.inventory.groupby("SupplierName", observed=True)["StockValue"]
                 .sum()
                 .sort_values(ascending=False)
             )
@@ -323,7 +425,7 @@ class InventoryModule:
 
             # Stock Value by Category
             category_value = (
-                self.inventory.groupby("Category")["StockValue"]
+                self.inventory.groupby("Category", observed=True)["StockValue"]
                 .sum()
                 .sort_values(ascending=False)
             )
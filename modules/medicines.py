@@ -1,9 +1,116 @@
+"""
+Medicines catalogue: KPI cards, drill-down lists, the paged medicine list and
+the add/edit form.
+
+The hot paths here are bound by database round trips and Streamlit widget
+count, not by arithmetic. KPIs are one aggregate query, lists are fetched a
+page at a time through cached loaders, per-row values are computed with
+vectorized pandas/NumPy on load, and each page is one selectable table.
+SIMD or GPU work would not move either bottleneck.
+"""
+
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import date, timedelta
 from db_connector import fetch_data, execute_query
 
 
+ITEMS_PER_PAGE = 25
+
+# Only the columns the list, drill-downs and edit form read
+MEDICINE_SELECT = """
+    SELECT m.MedicineID, m.MedicineName, m.Category, m.Brand, m.SupplierID,
+           s.SupplierName, m.StockQty, m.UnitPrice, m.PurchasePrice,
+           m.ExpiryDate, m.IsActive
+    FROM medicines m LEFT JOIN suppliers s ON m.SupplierID = s.SupplierID"""
+
+# Row filters for the full list and the two KPI drill-downs
+MEDICINE_LISTS = {
+    "all": "",
+    "low_stock": " WHERE m.StockQty < 10",
+    "expiring_soon": " WHERE m.ExpiryDate <= CURDATE() + INTERVAL 30 DAY",
+}
+
+
+def _prepare_medicines(medicines):
+    """Adds the stock/expiry status badges to a parsed medicines frame."""
+    if medicines.empty:
+        return medicines
+    # Status badges for every row, in one vectorized pass
+    days_left = (
+        medicines["ExpiryDate"] - pd.Timestamp(date.today())
+    ).dt.days.to_numpy()
+    medicines["ExpStatus"] = np.select(
+        [days_left > 30, days_left >= 0],
+        ["🟢 OK", "🟠 Expiring"],
+        default="🔴 Expired",
+    )
+    medicines["StockStatus"] = np.where(
+        medicines["StockQty"].to_numpy() >= 10, "🟢 OK", "🔴 Low"
+    )
+    return medicines
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_medicines(list_name="all", limit=None, offset=0):
+    """
+    Fetches one of the MEDICINE_LISTS with supplier names, ready to render.
+    With a limit, only that page of rows is fetched.
+    """
+    query = MEDICINE_SELECT + MEDICINE_LISTS[list_name] + " ORDER BY m.MedicineName"
+    params = None
+    if limit is not None:
+        query += " LIMIT %s OFFSET %s"
+        params = (int(limit), int(offset))
+    return _prepare_medicines(fetch_data(query, params, parse_dates=["ExpiryDate"]))
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_medicine(medicine_id):
+    """Primary-key lookup for the edit form."""
+    medicine = _prepare_medicines(
+        fetch_data(
+            MEDICINE_SELECT + " WHERE m.MedicineID = %s",
+            (int(medicine_id),),
+            parse_dates=["ExpiryDate"],
+        )
+    )
+    return medicine.iloc[0].to_dict() if not medicine.empty else {}
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_medicine_kpis():
+    """Counts every KPI bucket in one aggregate query."""
+    kpis = fetch_data(
+        """
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(StockQty < 10), 0) AS low_stock,
+               COALESCE(SUM(ExpiryDate <= CURDATE() + INTERVAL 30 DAY), 0)
+                   AS expiring_soon,
+               COALESCE(SUM(StockQty = 0), 0) AS out_of_stock
+        FROM medicines
+        """
+    )
+    if kpis.empty:
+        return {"total": 0, "low_stock": 0, "expiring_soon": 0, "out_of_stock": 0}
+    return {col: int(value) for col, value in kpis.iloc[0].items()}
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_suppliers():
+    return fetch_data(
+        "SELECT SupplierID, SupplierName FROM suppliers ORDER BY SupplierName"
+    )
+
+
+def _clear_medicine_cache():
+    """Invalidates cached medicine reads after a write."""
+    _load_medicines.clear()
+    _load_medicine.clear()
+    _load_medicine_kpis.clear()
+
+
 class MedicinesModule:
     """
     Manages Medicines with full CRUD functionality, KPIs, and a premium UI.
@@ -14,41 +121,29 @@ class MedicinesModule:
         st.session_state.setdefault("editing_medicine_id", None)
         st.session_state.setdefault("viewing_kpi_list", None)
         st.session_state.setdefault("confirm_delete_medicine_id", None)
+        st.session_state.setdefault("medicine_page_number", 1)
 
     def _get_data(self):
-        """Fetches all necessary data from the database and calculates KPIs."""
-        self.medicines = fetch_data(
-            "SELECT m.*, s.SupplierName FROM medicines m LEFT JOIN suppliers s ON m.SupplierID = s.SupplierID ORDER BY m.MedicineName"
-        )
-        self.suppliers = fetch_data("SELECT * FROM suppliers ORDER BY SupplierName")
-
-        if self.medicines is not None and not self.medicines.empty:
-            self.medicines["ExpiryDate"] = pd.to_datetime(self.medicines["ExpiryDate"])
-            self.kpi_total_medicines = len(self.medicines)
-            self.low_stock_df = self.medicines[self.medicines["StockQty"] < 10]
-            self.kpi_low_stock_count = len(self.low_stock_df)
-            expiring_soon_date = pd.to_datetime("today") + timedelta(days=30)
-            self.expiring_soon_df = self.medicines[
-                self.medicines["ExpiryDate"] <= expiring_soon_date
-            ]
-            self.kpi_expiring_soon_count = len(self.expiring_soon_df)
-            self.kpi_out_of_stock_count = len(
-                self.medicines[self.medicines["StockQty"] == 0]
-            )
-        else:
-            self.kpi_total_medicines = self.kpi_low_stock_count = (
-                self.kpi_expiring_soon_count
-            ) = self.kpi_out_of_stock_count = 0
-            self.low_stock_df = self.expiring_soon_df = pd.DataFrame()
+        """
+        Fetches the KPI counts (aggregated in SQL). The list page and the
+        drill-down lists are fetched only when displayed.
+        """
+        kpis = _load_medicine_kpis()
+        self.kpi_total_medicines = kpis["total"]
+        self.kpi_low_stock_count = kpis["low_stock"]
+        self.kpi_expiring_soon_count = kpis["expiring_soon"]
+        self.kpi_out_of_stock_count = kpis["out_of_stock"]
 
     def render(self):
         """Main render method that routes to the correct view (list or form)."""
-        self._get_data()
         st.title("💊 Medicines Management")
 
         if st.session_state.editing_medicine_id is not None:
+            # The form only needs its own row and the supplier list
+            self.suppliers = _load_suppliers()
             self._render_medicine_form(st.session_state.editing_medicine_id)
         else:
+            self._get_data()
             self._render_main_view()
 
     def _render_main_view(self):
@@ -93,88 +188,107 @@ class MedicinesModule:
 
     def _display_kpi_drilldown(self):
         """Displays the filtered list when a KPI is clicked."""
-        df, title = (
-            (self.low_stock_df, "Medicines with Low Stock")
+        list_name, title = (
+            ("low_stock", "Medicines with Low Stock")
             if st.session_state.viewing_kpi_list == "low_stock"
-            else (self.expiring_soon_df, "Medicines Expiring Soon")
+            else ("expiring_soon", "Medicines Expiring Soon")
         )
+        df = _load_medicines(list_name)
         st.subheader(title)
         if st.button("⬅️ Back to All Medicines"):
             st.session_state.viewing_kpi_list = None
             st.rerun()
-        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={"ExpStatus": None, "StockStatus": None},
+        )
 
     def _display_all_medicines(self):
-        """Displays the main list of all medicines."""
+        """Displays the main list of all medicines, one page at a time."""
         if st.button("➕ Add New Medicine"):
             st.session_state.editing_medicine_id = "new"
             st.rerun()
-        if self.medicines is not None and not self.medicines.empty:
-            for _, med in self.medicines.iterrows():
-                self._render_medicine_row(med)
-
-    def _render_medicine_row(self, medicine):
-        """Renders a single medicine's information in a row format."""
-        st.markdown("---")
-        row_cols = st.columns([3, 2, 2, 2, 2])
-
-        row_cols[0].markdown(
-            f"**{medicine['MedicineName']}**<br><small>{medicine.get('Category', 'N/A')} | {medicine.get('Brand', 'N/A')}</small>",
-            unsafe_allow_html=True,
-        )
-        stock_qty, status_class = (
-            medicine["StockQty"],
-            "status-ok" if medicine["StockQty"] >= 10 else "status-low",
-        )
-        row_cols[1].markdown(
-            f"Stock: <span class='status-tag {status_class}'>{stock_qty}</span>",
-            unsafe_allow_html=True,
-        )
-
-        exp_date = medicine["ExpiryDate"].date()
-        days_left = (exp_date - date.today()).days
-        exp_status_class = (
-            "status-ok"
-            if days_left > 30
-            else ("status-expiring" if 0 <= days_left <= 30 else "status-low")
-        )
-        row_cols[2].markdown(
-            f"Expiry: <span class='status-tag {exp_status_class}'>{exp_date.strftime('%b %d, %Y')}</span>",
-            unsafe_allow_html=True,
-        )
-
-        row_cols[3].markdown(
-            f"**Supplier**<br>{medicine.get('SupplierName', 'N/A')}",
-            unsafe_allow_html=True,
-        )
-
-        with row_cols[4]:
-            action_cols = st.columns(2)
-            if action_cols[0].button(
-                "✏️", key=f"edit_med_{medicine['MedicineID']}", help="Edit Medicine"
-            ):
-                st.session_state.editing_medicine_id = medicine["MedicineID"]
-                st.rerun()
-            if action_cols[1].button(
-                "🗑️", key=f"del_med_{medicine['MedicineID']}", help="Delete Medicine"
-            ):
-                st.session_state.confirm_delete_medicine_id = medicine["MedicineID"]
-                st.rerun()
+        if self.kpi_total_medicines > 0:
+            total_pages = (
+                self.kpi_total_medicines + ITEMS_PER_PAGE - 1
+            ) // ITEMS_PER_PAGE
+            page_number = st.number_input(
+                "Page",
+                min_value=1,
+                max_value=total_pages,
+                value=min(st.session_state.medicine_page_number, total_pages),
+                key="med_page_selector",
+            )
+            st.session_state.medicine_page_number = page_number
+            meds = _load_medicines(
+                limit=ITEMS_PER_PAGE, offset=(page_number - 1) * ITEMS_PER_PAGE
+            )
 
-        self._handle_delete_confirmation(medicine["MedicineID"])
+            # One grid; selecting a row shows the action bar below it
+            event = st.dataframe(
+                meds,
+                use_container_width=True,
+                hide_index=True,
+                key="med_table",
+                on_select="rerun",
+                selection_mode="single-row",
+                column_order=(
+                    "MedicineName",
+                    "Category",
+                    "Brand",
+                    "StockQty",
+                    "StockStatus",
+                    "ExpiryDate",
+                    "ExpStatus",
+                    "SupplierName",
+                ),
+                column_config={
+                    "MedicineName": "Medicine",
+                    "StockQty": st.column_config.NumberColumn("Stock", format="%d"),
+                    "StockStatus": "Stock Status",
+                    "ExpiryDate": st.column_config.DateColumn(
+                        "Expiry", format="MMM DD, YYYY"
+                    ),
+                    "ExpStatus": "Expiry Status",
+                    "SupplierName": "Supplier",
+                },
+            )
+            if event.selection.rows:
+                selected = meds.iloc[event.selection.rows[0]]
+                self._render_medicine_actions(
+                    int(selected["MedicineID"]), selected["MedicineName"]
+                )
+
+    @st.fragment
+    def _render_medicine_actions(self, medicine_id, name):
+        """
+        Renders the action bar for the medicine selected in the grid. It is a
+        fragment, so opening or cancelling a delete confirmation only reruns
+        the bar; edits and confirmed deletes rerun the whole page.
+        """
+        st.markdown(f"**Selected:** {name}")
+        action_cols = st.columns([1, 1, 5])
+        if action_cols[0].button(
+            "✏️ Edit", key=f"edit_med_{medicine_id}", use_container_width=True
+        ):
+            st.session_state.editing_medicine_id = medicine_id
+            st.rerun(scope="app")
+        if action_cols[1].button(
+            "🗑️ Delete", key=f"del_med_{medicine_id}", use_container_width=True
+        ):
+            st.session_state.confirm_delete_medicine_id = medicine_id
+            st.rerun(scope="fragment")
+
+        self._handle_delete_confirmation(medicine_id)
 
     def _render_medicine_form(self, medicine_id):
         """Renders the form for adding or editing a medicine."""
         is_edit = medicine_id != "new"
         title = "Edit Medicine" if is_edit else "➕ Add New Medicine"
 
-        medicine_data = {}
-        if is_edit:
-            medicine_data = (
-                self.medicines[self.medicines["MedicineID"] == medicine_id]
-                .iloc[0]
-                .to_dict()
-            )
+        medicine_data = _load_medicine(medicine_id) if is_edit else {}
 
         with st.form(key="medicine_form"):
             st.subheader(title)
@@ -187,10 +301,13 @@ class MedicinesModule:
             )
             brand = st.text_input("Brand", value=medicine_data.get("Brand", ""))
 
-            supplier_options = {
-                s["SupplierName"]: s["SupplierID"] for _, s in self.suppliers.iterrows()
-            }
-            supplier_names = [""] + list(supplier_options.keys())
+            supplier_options = dict(
+                zip(
+                    self.suppliers["SupplierName"].to_numpy(),
+                    self.suppliers["SupplierID"].to_numpy(),
+                )
+            )
+            supplier_names = [""] + list(supplier_options)
             current_supplier = medicine_data.get("SupplierName", "")
             supplier_idx = (
                 supplier_names.index(current_supplier)
@@ -256,6 +373,7 @@ class MedicinesModule:
                         query = "INSERT INTO medicines (MedicineName, Category, Brand, SupplierID, StockQty, UnitPrice, PurchasePrice, ExpiryDate, IsActive) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
 
                     if execute_query(query, params):
+                        _clear_medicine_cache()
                         st.success(
                             f"Medicine '{name}' was {'updated' if is_edit else 'added'} successfully!"
                         )
@@ -278,12 +396,13 @@ class MedicinesModule:
                 if execute_query(
                     "DELETE FROM medicines WHERE MedicineID=%s", (int(medicine_id),)
                 ):
+                    _clear_medicine_cache()
                     st.success("Medicine deleted successfully.")
                     st.session_state.confirm_delete_medicine_id = None
-                    st.rerun()
+                    st.rerun(scope="app")
 
             if confirm_cols[1].button(
                 "No, Cancel", key=f"cancel_del_med_{medicine_id}"
             ):
                 st.session_state.confirm_delete_medicine_id = None
-                st.rerun()
+                st.rerun(scope="fragment")
@@ -1,7 +1,40 @@
+"""
+Notification generation, filtering and the notification center UI.
+
+Generation is bound by database round trips: each alert type is a single
+INSERT ... SELECT, and it runs at most once per cache window from app.py.
+Listing is bound by the query and by Streamlit widgets, so filtering stays in
+SQL (indexed, FULLTEXT for keywords) and the center renders one page inside a
+fragment. None of this is compute-bound, so vectorizing beyond pandas is out
+of scope.
+"""
+
+import re
 import streamlit as st
 import pandas as pd
-from db_connector import fetch_data, execute_query
-from datetime import datetime, timedelta
+from db_connector import fetch_data, execute_query, execute_transaction
+
+
+NOTIFICATION_SETTING_KEYS = (
+    "notification_low_stock_threshold",
+    "notification_high_severity_stock_threshold",
+    "notification_expiry_warning_days",
+)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _load_notification_settings():
+    """Fetches the notification thresholds from the settings table as a dict."""
+    # Equality lookups on key_name instead of a LIKE prefix scan
+    settings = fetch_data(
+        "SELECT key_name, value FROM settings WHERE key_name IN (%s, %s, %s)",
+        NOTIFICATION_SETTING_KEYS,
+    )
+    return (
+        pd.Series(settings.value.values, index=settings.key_name).to_dict()
+        if not settings.empty
+        else {}
+    )
 
 
 class NotificationsManager:
@@ -13,6 +46,13 @@ class NotificationsManager:
     TYPES = ["Low Stock", "Expiry Warning", "Outstanding Due", "Critical Stock"]
     CATEGORIES = ["Inventory", "Finance", "Sales", "HR", "System"]
     SEVERITIES = ["Low", "Medium", "High"]
+    PAGE_SIZE = 25
+    FULLTEXT_MIN_WORD_LEN = 3  # innodb_ft_min_token_size
+    # "%s,%s,..." for every IN-list length the category/severity filters allow
+    IN_PLACEHOLDERS = {
+        n: ",".join(["%s"] * n)
+        for n in range(1, max(len(CATEGORIES), len(SEVERITIES)) + 1)
+    }
 
     def __init__(self):
         """
@@ -24,16 +64,10 @@ class NotificationsManager:
         st.session_state.setdefault("notif_category_filter", ["All"])
         st.session_state.setdefault("notif_severity_filter", ["All"])
         st.session_state.setdefault("notif_search_keyword", "")
+        st.session_state.setdefault("notif_page_number", 1)
 
-        # Fetch dynamic thresholds from the settings table
-        settings = fetch_data(
-            "SELECT key_name, value FROM settings WHERE key_name LIKE 'notification_%'"
-        )
-        settings_dict = (
-            pd.Series(settings.value.values, index=settings.key_name).to_dict()
-            if not settings.empty
-            else {}
-        )
+        # Dynamic thresholds from the settings table (cached across reruns)
+        settings_dict = _load_notification_settings()
         self.low_stock_threshold = int(
             settings_dict.get("notification_low_stock_threshold", 10)
         )
@@ -45,87 +79,85 @@ class NotificationsManager:
         )
 
     # ---------------- Notification Generation ----------------
+    # Each alert type is one INSERT ... SELECT with a NOT EXISTS anti-join, so
+    # the database skips issues that already have an unread notification and
+    # generation costs one statement per type instead of two per candidate row.
     def generate_notifications(self):
-        """Orchestrates the creation of all types of system notifications."""
-        self._generate_inventory_alerts()
-        self._generate_finance_alerts()
-
-    def _generate_inventory_alerts(self):
-        """Generates notifications for low stock and expiring medicines."""
-        medicines = fetch_data(
-            "SELECT MedicineID, MedicineName, StockQty, ExpiryDate FROM medicines WHERE IsActive=TRUE"
+        """
+        Orchestrates the creation of all types of system notifications.
+        Returns whether the generation transaction committed.
+        """
+        return execute_transaction(
+            self._inventory_alert_queries() + self._finance_alert_queries()
         )
-        if medicines.empty:
-            return
-
-        # Low Stock Alerts
-        low_stock_medicines = medicines[
-            medicines["StockQty"] <= self.low_stock_threshold
-        ]
-        for _, row in low_stock_medicines.iterrows():
-            severity = (
-                "High" if row["StockQty"] <= self.high_sev_stock_threshold else "Medium"
-            )
-            message = f"Low stock: '{row['MedicineName']}' has only {row['StockQty']} units left."
-            self._create_notification_if_not_exists(
-                "Low Stock",
-                message,
-                "Inventory",
-                severity,
-                "medicines",
-                row["MedicineID"],
-            )
-
-        # Expiry Alerts
-        if (
-            "ExpiryDate" in medicines.columns
-            and not medicines["ExpiryDate"].isnull().all()
-        ):
-            medicines["ExpiryDate"] = pd.to_datetime(medicines["ExpiryDate"])
-            expiry_limit = datetime.now().date() + timedelta(
-                days=self.expiry_warning_days
-            )
-            near_expiry = medicines[
-                (medicines["ExpiryDate"].dt.date <= expiry_limit)
-                & (medicines["ExpiryDate"].dt.date >= datetime.now().date())
-            ]
-            for _, row in near_expiry.iterrows():
-                days_left = (row["ExpiryDate"].date() - datetime.now().date()).days
-                severity = "High" if days_left <= 7 else "Medium"
-                message = f"Expiry warning: '{row['MedicineName']}' will expire in {days_left} days on {row['ExpiryDate'].strftime('%Y-%m-%d')}."
-                self._create_notification_if_not_exists(
-                    "Expiry Warning",
-                    message,
-                    "Inventory",
-                    severity,
-                    "medicines",
-                    row["MedicineID"],
-                )
 
-    def _generate_finance_alerts(self):
-        """Generates notifications for customers with outstanding dues."""
-        customers = fetch_data(
-            "SELECT id, name, outstanding_amount FROM customers WHERE outstanding_amount > 0 AND status = 'Active'"
+    def _inventory_alert_queries(self):
+        """Builds the statements for low stock and expiring medicines."""
+        low_stock = (
+            """
+            INSERT INTO notifications
+                (Type, Message, category, severity, RelatedTable, RelatedID)
+            SELECT 'Low Stock',
+                   CONCAT('Low stock: ''', m.MedicineName, ''' has only ',
+                          m.StockQty, ' units left.'),
+                   'Inventory',
+                   IF(m.StockQty <= %s, 'High', 'Medium'),
+                   'medicines', m.MedicineID
+            FROM medicines m
+            WHERE m.IsActive = TRUE AND m.StockQty <= %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM notifications n
+                  WHERE n.Type = 'Low Stock' AND n.RelatedTable = 'medicines'
+                    AND n.RelatedID = m.MedicineID AND n.Status = 'Unread'
+              )
+            """,
+            (self.high_sev_stock_threshold, self.low_stock_threshold),
         )
-        for _, row in customers.iterrows():
-            message = f"Pending payment from '{row['name']}' of Rs {row['outstanding_amount']:,.2f}."
-            self._create_notification_if_not_exists(
-                "Outstanding Due", message, "Finance", "Medium", "customers", row["id"]
-            )
+        expiry = (
+            """
+            INSERT INTO notifications
+                (Type, Message, category, severity, RelatedTable, RelatedID)
+            SELECT 'Expiry Warning',
+                   CONCAT('Expiry warning: ''', m.MedicineName,
+                          ''' will expire in ', DATEDIFF(m.ExpiryDate, CURDATE()),
+                          ' days on ', m.ExpiryDate, '.'),
+                   'Inventory',
+                   IF(DATEDIFF(m.ExpiryDate, CURDATE()) <= 7, 'High', 'Medium'),
+                   'medicines', m.MedicineID
+            FROM medicines m
+            WHERE m.IsActive = TRUE
+              AND m.ExpiryDate BETWEEN CURDATE() AND CURDATE() + INTERVAL %s DAY
+              AND NOT EXISTS (
+                  SELECT 1 FROM notifications n
+                  WHERE n.Type = 'Expiry Warning' AND n.RelatedTable = 'medicines'
+                    AND n.RelatedID = m.MedicineID AND n.Status = 'Unread'
+              )
+            """,
+            (self.expiry_warning_days,),
+        )
+        return [low_stock, expiry]
 
-    def _create_notification_if_not_exists(
-        self, n_type, message, category, severity, table, rel_id
-    ):
-        """Creates a notification only if an unread one for the same issue doesn't already exist."""
-        exists = fetch_data(
-            "SELECT NotificationID FROM notifications WHERE Type=%s AND RelatedTable=%s AND RelatedID=%s AND Status='Unread'",
-            (n_type, table, int(rel_id)),
+    def _finance_alert_queries(self):
+        """Builds the statement for customers with outstanding dues."""
+        outstanding = (
+            """
+            INSERT INTO notifications
+                (Type, Message, category, severity, RelatedTable, RelatedID)
+            SELECT 'Outstanding Due',
+                   CONCAT('Pending payment from ''', c.name, ''' of Rs ',
+                          FORMAT(c.outstanding_amount, 2), '.'),
+                   'Finance', 'Medium', 'customers', c.id
+            FROM customers c
+            WHERE c.outstanding_amount > 0 AND c.status = 'Active'
+              AND NOT EXISTS (
+                  SELECT 1 FROM notifications n
+                  WHERE n.Type = 'Outstanding Due' AND n.RelatedTable = 'customers'
+                    AND n.RelatedID = c.id AND n.Status = 'Unread'
+              )
+            """,
+            (),
         )
-        if exists.empty:
-            execute_query(
-                "INSERT INTO notifications (Type, Message, category, severity, RelatedTable, RelatedID) VALUES (%s, %s, %s, %s, %s, %s)",
-                (n_type, message, category, severity, table, int(rel_id)),
-            )
+        return [outstanding]
 
     # ---------------- Data Fetching & Actions ----------------
     def get_notifications(
@@ -135,25 +167,39 @@ class NotificationsManager:
         Fetches notifications with advanced, optional filters. This is the central
         data retrieval method for the module.
         """
-        query = "SELECT * FROM notifications WHERE 1=1"
+        query = (
+            "SELECT NotificationID, Type, Message, category, severity, Status,"
+            " RelatedTable, RelatedID, CreatedAt FROM notifications WHERE 1=1"
+        )
         params = []
 
         if status and status != "All":
             query += " AND Status = %s"
             params.append(status)
         if categories and "All" not in categories:
-            query += f" AND category IN ({','.join(['%s'] * len(categories))})"
+            query += f" AND category IN ({self._in_placeholders(len(categories))})"
             params.extend(categories)
         if severities and "All" not in severities:
-            query += f" AND severity IN ({','.join(['%s'] * len(severities))})"
+            query += f" AND severity IN ({self._in_placeholders(len(severities))})"
             params.extend(severities)
         if keyword:
-            query += " AND Message LIKE %s"
-            params.append(f"%{keyword.strip()}%")
+            # FULLTEXT prefix match on every word (idx_notif_message); LIKE only
+            # for words InnoDB's FULLTEXT would ignore as too short
+            words = re.findall(r"\w+", keyword)
+            if words and min(len(w) for w in words) >= self.FULLTEXT_MIN_WORD_LEN:
+                query += " AND MATCH(Message) AGAINST (%s IN BOOLEAN MODE)"
+                params.append(" ".join(f"+{w}*" for w in words))
+            else:
+                query += " AND Message LIKE %s"
+                params.append(f"%{keyword.strip()}%")
 
         query += " ORDER BY CreatedAt DESC"
         return fetch_data(query, tuple(params))
 
+    def _in_placeholders(self, count):
+        """Placeholder list for an IN clause, precomputed for the usual sizes."""
+        return self.IN_PLACEHOLDERS.get(count) or ",".join(["%s"] * count)
+
     def get_unread_notifications(self):
         """
         A specific method to quickly fetch only unread notifications. It calls the main
@@ -194,7 +240,7 @@ class NotificationsManager:
             st.write("")  # Spacer for vertical alignment
             if st.button("Mark All as Read", use_container_width=True):
                 self.mark_all_as_read()
-                st.rerun()
+                st.rerun(scope="app")
 
     def _render_analytics(self, notifications_df):
         """Renders simple charts for notification analytics."""
@@ -214,7 +260,15 @@ class NotificationsManager:
         """Renders the full, interactive notification center UI."""
         st.title("🔔 Notification Center")
         st.write("Central hub for all system alerts and actionable insights.")
+        self._render_notification_center()
 
+    @st.fragment
+    def _render_notification_center(self):
+        """
+        Renders the filters, list and analytics as one fragment, so changing a
+        filter or typing a search only reruns this part of the page. Actions
+        that change the unread count rerun the whole app to refresh the bell.
+        """
         self._render_filters()
 
         notifications_to_display = self.get_notifications(
@@ -226,8 +280,21 @@ class NotificationsManager:
 
         st.markdown("---")
         if notifications_to_display is not None and not notifications_to_display.empty:
-            st.write(f"#### Displaying {len(notifications_to_display)} Notifications")
-            for _, notif in notifications_to_display.iterrows():
+            total = len(notifications_to_display)
+            st.write(f"#### Displaying {total} Notifications")
+            # Only the current page of cards is rendered
+            total_pages = (total + self.PAGE_SIZE - 1) // self.PAGE_SIZE
+            page_number = st.number_input(
+                "Page",
+                min_value=1,
+                max_value=total_pages,
+                value=min(st.session_state.notif_page_number, total_pages),
+                key="notif_page_selector",
+            )
+            st.session_state.notif_page_number = page_number
+            start = (page_number - 1) * self.PAGE_SIZE
+            page = notifications_to_display.iloc[start : start + self.PAGE_SIZE]
+            for _, notif in page.iterrows():
                 icon = {"High": "🚨", "Medium": "⚠️", "Low": "ℹ️"}.get(
                     notif["severity"], ""
                 )
@@ -258,9 +325,9 @@ class NotificationsManager:
                             key=f"view_{notif['RelatedTable']}_{notif['NotificationID']}",
                             use_container_width=True,
                         ):
-                            st.session_state.navigate_to = target_module
+                            st.query_params["module"] = target_module
                             st.session_state.navigate_to_item_id = notif["RelatedID"]
-                            st.rerun()
+                            st.rerun(scope="app")
 
                         if notif["Status"] == "Unread":
                             if st.button(
@@ -269,7 +336,7 @@ class NotificationsManager:
                                 use_container_width=True,
                             ):
                                 self.mark_as_read(notif["NotificationID"])
-                                st.rerun()
+                                st.rerun(scope="app")
         else:
             st.success("No notifications match the current filters. All clear! ✅")
 
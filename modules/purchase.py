@@ -1,8 +1,115 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
-import json
 from db_connector import fetch_data, execute_query, execute_transaction
+from modules.inventory import _clear_inventory_cache
+from modules.medicines import _clear_medicine_cache
+
+# pandas' bundled C JSON decoder is quicker on the small ItemsData payloads
+try:
+    from pandas.io.json import ujson_loads
+except ImportError:  # pandas < 2.0
+    from json import loads as ujson_loads
+
+
+# Columns shown in the purchase order grid
+PO_LIST_COLUMNS = (
+    "PurchaseOrderID",
+    "SupplierName",
+    "Status",
+    "OrderDate",
+    "ExpectedDeliveryDate",
+)
+
+# Column order of a PO line item, as stored in ItemsData
+PO_ITEM_COLUMNS = ("MedicineID", "MedicineName", "Quantity", "PurchasePrice")
+
+
+def _empty_po_items():
+    """Column-wise buffer for the items of a PO being created."""
+    return {column: [] for column in PO_ITEM_COLUMNS}
+
+
+def _parse_items(items_data):
+    """Decodes one PO's ItemsData JSON into a list of item dicts."""
+    if isinstance(items_data, str) and items_data:
+        return ujson_loads(items_data)
+    return items_data if isinstance(items_data, list) else []
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def _po_items_frame(items_data):
+    """Item table for one PO, cached on its raw ItemsData."""
+    return pd.DataFrame(_parse_items(items_data))
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_purchase_orders():
+    """
+    Fetches all purchase orders with supplier names and their items decoded
+    into ItemsParsed, plus a lowercased copy of the searchable columns so
+    searches don't re-case them per keystroke.
+    """
+    orders = fetch_data(
+        """
+        SELECT p.*, s.SupplierName FROM purchase_orders p
+        LEFT JOIN suppliers s ON p.SupplierID = s.SupplierID
+        ORDER BY p.OrderDate DESC, p.PurchaseOrderID DESC
+    """
+    )
+    if orders.empty:
+        return orders, pd.DataFrame(columns=["poid", "sup", "st"])
+    # Every PO's items are decoded once per load, not on each render
+    orders["ItemsParsed"] = orders["ItemsData"].map(_parse_items)
+    search_index = pd.DataFrame(
+        {
+            "poid": orders["PurchaseOrderID"].astype(str),
+            "sup": orders["SupplierName"].fillna("").str.lower(),
+            "st": orders["Status"].fillna("").str.lower(),
+        }
+    )
+    return orders, search_index
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_suppliers():
+    return fetch_data(
+        "SELECT SupplierID, SupplierName FROM suppliers WHERE IsActive = TRUE"
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_medicines():
+    return fetch_data(
+        "SELECT MedicineID, MedicineName, PurchasePrice FROM medicines WHERE IsActive = TRUE"
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_purchase_returns():
+    return fetch_data(
+        """
+        SELECT pr.ReturnID, pr.ReturnDate, pr.Quantity, pr.Reason,
+               po.PurchaseOrderID, m.MedicineName, s.SupplierName
+        FROM purchase_returns pr
+        JOIN purchase_orders po ON pr.PurchaseOrderID = po.PurchaseOrderID
+        JOIN medicines m ON pr.MedicineID = m.MedicineID
+        JOIN suppliers s ON po.SupplierID = s.SupplierID
+        ORDER BY pr.ReturnDate DESC
+    """
+    )
+
+
+def _clear_purchase_cache():
+    """Drops the cached purchase orders and returns after a write."""
+    _load_purchase_orders.clear()
+    _load_purchase_returns.clear()
+
+
+def _clear_stock_caches():
+    """Drops the other modules' cached stock levels after a stock change."""
+    _clear_inventory_cache()
+    _clear_medicine_cache()
 
 
 class PurchaseModule:
@@ -16,38 +123,47 @@ class PurchaseModule:
             st.session_state.show_create_return = False
         if "editing_po_id" not in st.session_state:
             st.session_state.editing_po_id = None
+        if "confirm_delete_po_id" not in st.session_state:
+            st.session_state.confirm_delete_po_id = None
         if "po_items" not in st.session_state:
             st.session_state.po_items = []
+        if "new_po_items" not in st.session_state:
+            st.session_state.new_po_items = _empty_po_items()
 
     def _get_data(self):
-        """Fetches all necessary data from the database for this module."""
-        self.purchase_orders = fetch_data(
-            """
-            SELECT p.*, s.SupplierName FROM purchase_orders p
-            LEFT JOIN suppliers s ON p.SupplierID = s.SupplierID
-            ORDER BY p.OrderDate DESC, p.PurchaseOrderID DESC
-        """
-        )
-        self.suppliers = fetch_data(
-            "SELECT SupplierID, SupplierName FROM suppliers WHERE IsActive = TRUE"
-        )
-        self.medicines = fetch_data(
-            "SELECT MedicineID, MedicineName, PurchasePrice FROM medicines WHERE IsActive = TRUE"
+        """Fetches all necessary data for this module through the cached loaders."""
+        self.purchase_orders, self._po_search_index = _load_purchase_orders()
+        self.suppliers = _load_suppliers()
+        self.medicines = _load_medicines()
+        self._sup_id_by_name = dict(
+            zip(
+                self.suppliers["SupplierName"].to_numpy(),
+                self.suppliers["SupplierID"].to_numpy(),
+            )
         )
-        self.purchase_returns = fetch_data(
-            """
-            SELECT pr.ReturnID, pr.ReturnDate, pr.Quantity, pr.Reason,
-                   po.PurchaseOrderID, m.MedicineName, s.SupplierName
-            FROM purchase_returns pr
-            JOIN purchase_orders po ON pr.PurchaseOrderID = po.PurchaseOrderID
-            JOIN medicines m ON pr.MedicineID = m.MedicineID
-            JOIN suppliers s ON po.SupplierID = s.SupplierID
-            ORDER BY pr.ReturnDate DESC
-        """
+        self._med_by_name = {
+            name: (int(med_id), float(price))
+            for name, med_id, price in zip(
+                self.medicines["MedicineName"].to_numpy(),
+                self.medicines["MedicineID"].to_numpy(),
+                self.medicines["PurchasePrice"].to_numpy(),
+            )
+        }
+        self._med_name_by_id = dict(
+            zip(
+                self.medicines["MedicineID"].to_numpy(),
+                self.medicines["MedicineName"].to_numpy(),
+            )
         )
+        self.purchase_returns = _load_purchase_returns()
 
+    @st.fragment
     def _display_purchase_orders(self):
-        """Renders the UI for purchase order management, including search and actions."""
+        """
+        Renders the UI for purchase order management, including search and
+        actions. It is a fragment, so typing a search or selecting a PO only
+        reruns this tab; anything that writes or switches views reruns the app.
+        """
         st.subheader("Manage Purchase Orders")
 
         cols = st.columns([3, 1])
@@ -57,65 +173,73 @@ class PurchaseModule:
             if st.button("📝 Create New Purchase Order", use_container_width=True):
                 st.session_state.show_create_po = True
                 st.session_state.editing_po_id = None
-                st.session_state.po_items = []
+                st.session_state.new_po_items = _empty_po_items()
+                st.rerun(scope="app")
 
         if search_query:
-            po_df_search = self.purchase_orders.copy()
-            po_df_search["PurchaseOrderID"] = po_df_search["PurchaseOrderID"].astype(
-                str
+            # Plain substring match against the pre-lowercased columns
+            needle = search_query.lower()
+            index = self._po_search_index
+            mask = (
+                index["poid"].str.contains(needle, regex=False).to_numpy()
+                | index["sup"].str.contains(needle, regex=False).to_numpy()
+                | index["st"].str.contains(needle, regex=False).to_numpy()
             )
-            filtered_pos = po_df_search[
-                po_df_search["PurchaseOrderID"].str.contains(search_query, case=False)
-                | po_df_search["SupplierName"].str.contains(search_query, case=False)
-                | po_df_search["Status"].str.contains(search_query, case=False)
-            ]
+            filtered_pos = self.purchase_orders[mask]
         else:
             filtered_pos = self.purchase_orders
 
         if filtered_pos.empty:
             st.info("No purchase orders found matching your search.")
+            return
 
-        for _, row in filtered_pos.iterrows():
-            with st.expander(
-                f"PO #{row['PurchaseOrderID']} - {row['SupplierName']} (Status: {row['Status']})"
+        # One grid; selecting a row shows the action bar and items below it
+        # Only the listed columns go to the browser, not the item payloads
+        event = st.dataframe(
+            filtered_pos[list(PO_LIST_COLUMNS)],
+            use_container_width=True,
+            hide_index=True,
+            key="po_table",
+            on_select="rerun",
+            selection_mode="single-row",
+            column_config={
+                "PurchaseOrderID": st.column_config.NumberColumn("PO #", format="%d"),
+                "SupplierName": "Supplier",
+                "OrderDate": st.column_config.DateColumn("Order Date"),
+                "ExpectedDeliveryDate": st.column_config.DateColumn(
+                    "Expected Delivery"
+                ),
+            },
+        )
+        if event.selection.rows:
+            self._render_po_actions(filtered_pos.iloc[event.selection.rows[0]])
+
+    def _render_po_actions(self, po):
+        """Renders the action bar and items for the PO selected in the grid."""
+        po_id = int(po["PurchaseOrderID"])
+        st.markdown(
+            f"**Selected:** PO #{po_id} - {po['SupplierName']} (Status: {po['Status']})"
+        )
+        if po["Status"] == "Pending":
+            action_cols = st.columns(3)
+            if action_cols[0].button(
+                "✏️ Edit", key=f"edit_{po_id}", use_container_width=True
             ):
-                cols = st.columns([2, 1])
-                with cols[0]:
-                    st.write(f"**Order Date:** {row['OrderDate']}")
-                    st.write(f"**Expected Delivery:** {row['ExpectedDeliveryDate']}")
-                with cols[1]:
-                    action_cols = st.columns(3)
-                    if row["Status"] == "Pending":
-                        if action_cols[0].button(
-                            "✏️ Edit",
-                            key=f"edit_{row['PurchaseOrderID']}",
-                            use_container_width=True,
-                        ):
-                            st.session_state.editing_po_id = row["PurchaseOrderID"]
-                            st.session_state.show_create_po = False
-                            st.rerun()
-                        if action_cols[1].button(
-                            "🗑️ Delete",
-                            key=f"del_{row['PurchaseOrderID']}",
-                            use_container_width=True,
-                        ):
-                            self._handle_po_delete(row["PurchaseOrderID"])
-                    if row["Status"] == "Pending":
-                        if action_cols[2].button(
-                            "✅ Mark Received",
-                            key=f"receive_{row['PurchaseOrderID']}",
-                            use_container_width=True,
-                        ):
-                            self._mark_po_as_received(
-                                row["PurchaseOrderID"], row["ItemsData"]
-                            )
-
-                items_data = row["ItemsData"]
-                if items_data and isinstance(items_data, str):
-                    items = pd.DataFrame(json.loads(items_data))
-                else:
-                    items = pd.DataFrame(items_data if items_data else [])
-                st.dataframe(items, use_container_width=True)
+                st.session_state.editing_po_id = po_id
+                st.session_state.show_create_po = False
+                st.rerun(scope="app")
+            if action_cols[1].button(
+                "🗑️ Delete", key=f"del_{po_id}", use_container_width=True
+            ):
+                st.session_state.confirm_delete_po_id = po_id
+            if action_cols[2].button(
+                "✅ Mark Received", key=f"receive_{po_id}", use_container_width=True
+            ):
+                self._mark_po_as_received(po_id, po["ItemsParsed"])
+            if st.session_state.confirm_delete_po_id == po_id:
+                self._handle_po_delete(po_id)
+
+        st.dataframe(_po_items_frame(po["ItemsData"]), use_container_width=True)
 
     def _create_po_modal(self):
         """Renders a UI for creating a new PO, correctly separating item adding from form submission."""
@@ -128,28 +252,20 @@ class PurchaseModule:
         qty = cols[1].number_input("Quantity", min_value=1, step=1)
 
         if cols[2].button("Add Item", use_container_width=True):
-            med_id = self.medicines[self.medicines["MedicineName"] == med_name][
-                "MedicineID"
-            ].iloc[0]
-            price = self.medicines[self.medicines["MedicineName"] == med_name][
-                "PurchasePrice"
-            ].iloc[0]
-            st.session_state.po_items.append(
-                {
-                    "MedicineID": int(med_id),
-                    "MedicineName": med_name,
-                    "Quantity": int(qty),
-                    "PurchasePrice": float(price),
-                }
-            )
+            med_id, price = self._med_by_name[med_name]
+            # Appends to each column list; no per-item dict is kept around
+            for column, value in zip(
+                PO_ITEM_COLUMNS, (med_id, med_name, int(qty), price)
+            ):
+                st.session_state.new_po_items[column].append(value)
 
-        if st.session_state.po_items:
+        if st.session_state.new_po_items["MedicineID"]:
             st.write("Order Items:")
             st.dataframe(
-                pd.DataFrame(st.session_state.po_items), use_container_width=True
+                pd.DataFrame(st.session_state.new_po_items), use_container_width=True
             )
             if st.button("Clear All Items", type="secondary"):
-                st.session_state.po_items = []
+                st.session_state.new_po_items = _empty_po_items()
                 st.rerun()
         st.markdown("---")
 
@@ -170,42 +286,54 @@ class PurchaseModule:
             )
 
             if submitted:
-                if not supplier_name or not st.session_state.po_items:
+                if not supplier_name or not st.session_state.new_po_items["MedicineID"]:
                     st.error("Please select a supplier and add at least one item.")
                 else:
-                    supplier_id = self.suppliers[
-                        self.suppliers["SupplierName"] == supplier_name
-                    ]["SupplierID"].iloc[0]
-                    if execute_query(
+                    supplier_id = self._sup_id_by_name[supplier_name]
+                    new_items = st.session_state.new_po_items
+                    items_data = [
+                        dict(zip(PO_ITEM_COLUMNS, item))
+                        for item in zip(*(new_items[c] for c in PO_ITEM_COLUMNS))
+                    ]
+                    success, _ = execute_query(
                         "INSERT INTO purchase_orders (SupplierID, OrderDate, ExpectedDeliveryDate, Status, ItemsData) VALUES (%s, %s, %s, 'Pending', %s)",
                         (
                             int(supplier_id),
                             order_date,
                             expected_date,
-                            st.session_state.po_items,
+                            items_data,
                         ),
-                    ):
+                    )
+                    if success:
+                        _clear_purchase_cache()
                         st.success("Purchase Order created successfully!")
                         st.session_state.show_create_po = False
-                        st.session_state.po_items = []
+                        st.session_state.new_po_items = _empty_po_items()
                         st.rerun()
 
             if cancelled:
                 st.session_state.show_create_po = False
-                st.session_state.po_items = []
+                st.session_state.new_po_items = _empty_po_items()
                 st.rerun()
 
     def _handle_po_delete(self, po_id):
         """Deletes a purchase order after confirmation."""
         st.warning(f"Are you sure you want to delete Purchase Order #{po_id}?")
-        if st.button("Confirm Delete", key=f"confirm_del_{po_id}"):
-            if execute_query(
+        confirm_cols = st.columns([1, 1, 5])
+        if confirm_cols[0].button("Confirm Delete", key=f"confirm_del_{po_id}"):
+            success, _ = execute_query(
                 "DELETE FROM purchase_orders WHERE PurchaseOrderID = %s", (po_id,)
-            ):
+            )
+            if success:
+                _clear_purchase_cache()
+                st.session_state.confirm_delete_po_id = None
                 st.success(f"Purchase Order #{po_id} has been deleted.")
-                st.rerun()
+                st.rerun(scope="app")
             else:
                 st.error("Failed to delete the purchase order.")
+        if confirm_cols[1].button("Cancel", key=f"cancel_del_{po_id}"):
+            st.session_state.confirm_delete_po_id = None
+            st.rerun(scope="fragment")
 
     def _edit_po_modal(self):
         """Renders a modal form to edit an existing Purchase Order."""
@@ -213,11 +341,7 @@ class PurchaseModule:
             self.purchase_orders["PurchaseOrderID"] == st.session_state.editing_po_id
         ].iloc[0]
         if "po_items" not in st.session_state or not st.session_state.po_items:
-            st.session_state.po_items = (
-                json.loads(po_to_edit["ItemsData"])
-                if po_to_edit["ItemsData"] and isinstance(po_to_edit["ItemsData"], str)
-                else []
-            )
+            st.session_state.po_items = list(po_to_edit["ItemsParsed"])
         with st.form("edit_po_form"):
             st.title(f"✏️ Editing Purchase Order #{st.session_state.editing_po_id}")
             supplier_names = self.suppliers["SupplierName"].tolist()
@@ -249,11 +373,9 @@ class PurchaseModule:
                 if not supplier_name or st.session_state.po_items.empty:
                     st.error("Supplier and at least one item are required.")
                 else:
-                    supplier_id = self.suppliers[
-                        self.suppliers["SupplierName"] == supplier_name
-                    ]["SupplierID"].iloc[0]
+                    supplier_id = self._sup_id_by_name[supplier_name]
                     items_data = st.session_state.po_items.to_dict("records")
-                    if execute_query(
+                    success, _ = execute_query(
                         "UPDATE purchase_orders SET SupplierID=%s, OrderDate=%s, ExpectedDeliveryDate=%s, ItemsData=%s WHERE PurchaseOrderID=%s",
                         (
                             int(supplier_id),
@@ -262,7 +384,9 @@ class PurchaseModule:
                             items_data,
                             st.session_state.editing_po_id,
                         ),
-                    ):
+                    )
+                    if success:
+                        _clear_purchase_cache()
                         st.success("Purchase Order updated successfully!")
                         st.session_state.editing_po_id = None
                         st.session_state.po_items = []
@@ -274,30 +398,36 @@ class PurchaseModule:
                 st.session_state.po_items = []
                 st.rerun()
 
-    def _mark_po_as_received(self, po_id, items_data_json):
+    def _mark_po_as_received(self, po_id, items):
         """Updates PO status and medicine stock in a single transaction."""
         st.info("Processing order... Please wait.")
-        items_df = pd.DataFrame(
-            json.loads(items_data_json)
-            if items_data_json and isinstance(items_data_json, str)
-            else []
-        )
         queries = [
             (
                 "UPDATE purchase_orders SET Status = 'Received' WHERE PurchaseOrderID = %s",
                 (po_id,),
             )
         ]
-        for _, item in items_df.iterrows():
+        # Total quantity per medicine, so repeated lines add up in the CASE
+        received = {}
+        for item in items:
+            med_id = int(item["MedicineID"])
+            received[med_id] = received.get(med_id, 0) + int(item["Quantity"])
+        if received:
+            # All stock increments in one statement instead of one per item
+            cases = " ".join(["WHEN %s THEN %s"] * len(received))
+            placeholders = ",".join(["%s"] * len(received))
+            params = [value for pair in received.items() for value in pair]
             queries.append(
                 (
-                    "UPDATE medicines SET StockQty = StockQty + %s WHERE MedicineID = %s",
-                    (item["Quantity"], item["MedicineID"]),
+                    f"UPDATE medicines SET StockQty = StockQty + CASE MedicineID {cases} END WHERE MedicineID IN ({placeholders})",
+                    (*params, *received),
                 )
             )
         if execute_transaction(queries):
+            _clear_purchase_cache()
+            _clear_stock_caches()
             st.success(f"PO #{po_id} marked as received and stock updated!")
-            st.rerun()
+            st.rerun(scope="app")
         else:
             st.error("An error occurred. Stock levels have not been changed.")
 
@@ -343,19 +473,16 @@ class PurchaseModule:
             )
 
             selected_po_data = po_options[selected_po_str]
-            po_items = json.loads(selected_po_data["ItemsData"])
-
-            # --- ✅ FIX STARTS HERE ---
-            # Create a mapping from MedicineID to MedicineName for quick lookups
-            medicine_id_to_name = pd.Series(
-                self.medicines.MedicineName.values, index=self.medicines.MedicineID
-            ).to_dict()
-            # Add the MedicineName to each item in the list using the mapping
-            for item in po_items:
-                item["MedicineName"] = medicine_id_to_name.get(
-                    item["MedicineID"], "Unknown Medicine"
-                )
-            # --- ✅ FIX ENDS HERE ---
+            # Name each item from the shared lookup, without touching the PO's own items
+            po_items = [
+                {
+                    **item,
+                    "MedicineName": self._med_name_by_id.get(
+                        item["MedicineID"], "Unknown Medicine"
+                    ),
+                }
+                for item in selected_po_data["ItemsParsed"]
+            ]
 
             medicine_options = {item["MedicineName"]: item for item in po_items}
             selected_med_name = st.selectbox(
@@ -393,6 +520,8 @@ class PurchaseModule:
                         ),
                     ]
                     if execute_transaction(queries):
+                        _clear_purchase_cache()
+                        _clear_stock_caches()
                         st.success(
                             "Purchase return recorded successfully and stock updated!"
                         )